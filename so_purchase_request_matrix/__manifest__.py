@@ -11,14 +11,20 @@
         "mail",
         "web",
     ],
+    "external_dependencies": {
+        "python": ["numpy"],
+    },
     "data": [
         "security/security.xml",
         "security/ir.model.access.csv",
         "data/sequence.xml",
+        "data/ir_cron.xml",
         "views/purchase_request_views.xml",
         "views/sale_order_views.xml",
         "views/purchase_order_views.xml",
+        "views/perf_log_views.xml",
         "wizard/so_create_request_views.xml",
+        "wizard/prq_quote_import_views.xml",
         "views/assets.xml",
         "views/menu.xml",
     ],
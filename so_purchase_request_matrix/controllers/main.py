@@ -0,0 +1,75 @@
+import csv
+import io
+import tempfile
+
+import xlsxwriter
+from werkzeug.wsgi import wrap_file
+
+from odoo import api, http
+from odoo.http import Response, content_disposition, request
+from odoo.tools import split_every
+
+# Rows of the CSV export sent to the client per chunk
+CSV_EXPORT_CHUNK_ROWS = 500
+
+
+class PurchaseRequestMatrixController(http.Controller):
+
+    @http.route("/so_purchase_request_matrix/export/<int:request_id>/<string:file_format>", type="http", auth="user")
+    def export_matrix(self, request_id, file_format, **kwargs):
+        """Download the comparison matrix of a purchase request as CSV or XLSX."""
+        purchase_request = request.env["so.purchase.request"].browse(request_id).exists()
+        if not purchase_request or file_format not in ("csv", "xlsx"):
+            raise request.not_found()
+        purchase_request.check_access_rights("read")
+        purchase_request.check_access_rule("read")
+        filename = f"{purchase_request.name.replace('/', '_')}.{file_format}"
+        if file_format == "csv":
+            return self._export_matrix_csv(purchase_request, filename)
+        return self._export_matrix_xlsx(purchase_request, filename)
+
+    def _export_matrix_csv(self, purchase_request, filename):
+        """Stream the CSV chunk by chunk.
+
+        The rows are generated while the response is sent, after the request cursor is
+        closed, hence from a cursor of their own.
+        """
+        registry = purchase_request.env.registry
+        uid = purchase_request.env.uid
+        context = dict(purchase_request.env.context)
+        request_id = purchase_request.id
+
+        def generate():
+            with registry.cursor() as cr:
+                env = api.Environment(cr, uid, context)
+                rows = env["so.purchase.request"].browse(request_id)._get_matrix_export_rows()
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                for chunk in split_every(CSV_EXPORT_CHUNK_ROWS, rows, list):
+                    writer.writerows(chunk)
+                    yield buffer.getvalue().encode()
+                    buffer.seek(0)
+                    buffer.truncate()
+
+        return Response(generate(), headers=[
+            ("Content-Type", "text/csv; charset=utf-8"),
+            ("Content-Disposition", content_disposition(filename)),
+        ], direct_passthrough=True)
+
+    def _export_matrix_xlsx(self, purchase_request, filename):
+        """Write the workbook row by row to a temporary file and stream the file.
+
+        With ``constant_memory`` each row is flushed to disk once the next one starts.
+        """
+        file = tempfile.TemporaryFile()
+        workbook = xlsxwriter.Workbook(file, {"constant_memory": True})
+        sheet = workbook.add_worksheet(purchase_request.name[:31].replace("/", "_"))
+        bold = workbook.add_format({"bold": True})
+        for index, row in enumerate(purchase_request._get_matrix_export_rows()):
+            sheet.write_row(index, 0, row, bold if index == 0 else None)
+        workbook.close()
+        file.seek(0)
+        return Response(wrap_file(request.httprequest.environ, file), headers=[
+            ("Content-Type", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+            ("Content-Disposition", content_disposition(filename)),
+        ], direct_passthrough=True)
@@ -1,3 +1,8 @@
+from . import perf_log
 from . import purchase_request
 from . import sale_order
 from . import purchase_order
+from . import purchase_request_job
+from . import vendor_summary
+from . import price_history
+from . import ir_websocket
@@ -0,0 +1,88 @@
+"""Vectorized cost-minimal allocation of requested quantities across vendors.
+
+The problem is expressed on a product x vendor grid: unit prices (``inf`` where a
+vendor cannot supply the product), quoted capacities (``inf`` when unbounded) and
+the demand per product. Without cross-product constraints, filling each product
+from its cheapest vendors first is optimal; the per-vendor constraints (maximum
+number of vendors, minimum order value) are then enforced by greedily dropping
+the vendor whose removal increases the total cost the least.
+"""
+import numpy as np
+
+EPSILON = 1e-6
+
+
+def fill_cheapest(prices, capacities, demand, active):
+    """Allocate each product's demand to its cheapest active vendors, up to their capacity.
+
+    :param prices: (P, V) unit prices, ``inf`` where the vendor cannot supply
+    :param capacities: (P, V) quantities the vendors can supply
+    :param demand: (P,) quantities to allocate
+    :param active: (V,) boolean mask of the vendors that may be used
+    :return: (P, V) allocated quantities
+    """
+    prices = np.where(active[np.newaxis, :], prices, np.inf)
+    order = np.argsort(prices, axis=1, kind="stable")
+    sorted_prices = np.take_along_axis(prices, order, axis=1)
+    sorted_caps = np.where(np.isfinite(sorted_prices), np.take_along_axis(capacities, order, axis=1), 0.0)
+    # quantity already covered by the cheaper vendors (exclusive cumulative sum, inf-safe)
+    covered = np.zeros_like(sorted_caps)
+    covered[:, 1:] = np.cumsum(sorted_caps[:, :-1], axis=1)
+    sorted_alloc = np.clip(demand[:, np.newaxis] - covered, 0.0, sorted_caps)
+    alloc = np.zeros_like(sorted_alloc)
+    np.put_along_axis(alloc, order, sorted_alloc, axis=1)
+    return alloc
+
+
+def _evaluate(prices, capacities, demand, active):
+    alloc = fill_cheapest(prices, capacities, demand, active)
+    unmet = np.maximum(demand - alloc.sum(axis=1), 0.0)
+    spend = (alloc * np.where(np.isfinite(prices), prices, 0.0)).sum(axis=0)
+    return alloc, unmet, spend
+
+
+def solve_allocation(prices, capacities, demand, single_vendor=False, max_vendors=0, min_order_value=0.0):
+    """Compute a cost-minimal allocation of ``demand`` over the vendors.
+
+    :param prices: (P, V) unit prices, ``inf`` where the vendor cannot supply
+    :param capacities: (P, V) quantities the vendors can supply, ``inf`` when unbounded
+    :param demand: (P,) quantities to allocate
+    :param single_vendor: each product must be fully supplied by a single vendor
+    :param max_vendors: maximum number of vendors used overall (0 for no limit)
+    :param min_order_value: minimum total value ordered from any used vendor (0 for none)
+    :return: tuple ``(alloc, unmet)`` of the (P, V) allocated quantities and the (P,)
+             quantities that could not be allocated
+    """
+    prices = np.asarray(prices, dtype=float)
+    capacities = np.asarray(capacities, dtype=float)
+    demand = np.asarray(demand, dtype=float)
+    if single_vendor:
+        # only vendors able to cover the whole demand compete, and they take all of it
+        prices = np.where(capacities + EPSILON >= demand[:, np.newaxis], prices, np.inf)
+        capacities = np.full_like(capacities, np.inf)
+    active = np.ones(prices.shape[1], dtype=bool)
+    alloc, unmet, spend = _evaluate(prices, capacities, demand, active)
+    base_unmet = unmet.sum()
+    while True:
+        used = alloc.sum(axis=0) > EPSILON
+        candidates = used & (spend + EPSILON < min_order_value)
+        if not candidates.any() and max_vendors and used.sum() > max_vendors:
+            candidates = used
+        if not candidates.any():
+            return alloc, unmet
+        best = None
+        for vendor in np.flatnonzero(candidates):
+            trial_active = active.copy()
+            trial_active[vendor] = False
+            trial = _evaluate(prices, capacities, demand, trial_active)
+            # never trade allocated quantities for a lower cost
+            if trial[1].sum() > base_unmet + EPSILON:
+                continue
+            cost = trial[2].sum()
+            if best is None or cost < best[0]:
+                best = (cost, vendor, trial)
+        if best is None:
+            # dropping any vendor would leave demand unallocated: keep the current solution
+            return alloc, unmet
+        active[best[1]] = False
+        alloc, unmet, spend = best[2]
@@ -0,0 +1,24 @@
+import re
+
+from odoo import models
+
+# channel name the matrix widget subscribes to, see ``so.purchase.request._get_matrix_channel``
+MATRIX_CHANNEL_RE = re.compile(r"so_prq_matrix_(\d+)")
+
+
+class IrWebsocket(models.AbstractModel):
+    _inherit = "ir.websocket"
+
+    def _build_bus_channel_list(self, channels):
+        """Replace the matrix channels sent by the client with the requests the user can read."""
+        channels = list(channels)
+        request_ids = set()
+        for channel in list(channels):
+            match = isinstance(channel, str) and MATRIX_CHANNEL_RE.fullmatch(channel)
+            if match:
+                channels.remove(channel)
+                request_ids.add(int(match[1]))
+        Request = self.env["so.purchase.request"]
+        if request_ids and Request.check_access_rights("read", raise_exception=False):
+            channels.extend(Request.search([("id", "in", list(request_ids))]))
+        return super()._build_bus_channel_list(channels)
@@ -0,0 +1,90 @@
+import threading
+import time
+
+from odoo import fields
+from odoo.tools import float_round
+
+
+class NormalizationCache:
+    """Memoizes the lookups needed to normalize quotes to request UoM and company currency.
+
+    An instance is meant to live for one batch of computations (a compute call, a PO
+    generation). Request lines are prefetched per request and indexed by product,
+    currency rates are memoized by (from, to, company, date) and UoM factors by
+    (from, to). Rates may additionally be shared between batches of the same process
+    for ``so_purchase_request_matrix.rate_cache_ttl`` seconds (0, the default, disables it).
+    """
+
+    _shared_rates = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, env):
+        self.env = env
+        self._rates = {}
+        self._uom_factors = {}
+        self._request_uoms = {}
+        self._prefetched_request_ids = set()
+        self._rate_ttl = int(env["ir.config_parameter"].sudo().get_param("so_purchase_request_matrix.rate_cache_ttl", 0) or 0)
+
+    # ---------- Request lines ----------
+    def prefetch_request_lines(self, requests):
+        requests = requests.filtered(lambda r: r.id not in self._prefetched_request_ids)
+        stored = requests.filtered(lambda r: isinstance(r.id, int))
+        if stored:
+            lines = self.env["so.purchase.request.line"].search([("request_id", "in", stored.ids)])
+        else:
+            lines = self.env["so.purchase.request.line"]
+        # new (onchange) requests only have their lines in memory
+        lines |= (requests - stored).line_ids
+        for line in lines:
+            # first line wins, like a search(limit=1) on the default order
+            self._request_uoms.setdefault((line.request_id.id, line.product_id.id), line.product_uom_id)
+        self._prefetched_request_ids.update(requests.ids)
+
+    def request_uom(self, request, product):
+        """UoM of the request line for ``product``, falling back to its purchase UoM."""
+        if request.id not in self._prefetched_request_ids:
+            self.prefetch_request_lines(request)
+        return self._request_uoms.get((request.id, product.id)) or product.uom_po_id
+
+    # ---------- Units of measure ----------
+    def quantity(self, qty, from_uom, to_uom, rounding_method="HALF-UP"):
+        """Same result as ``from_uom._compute_quantity(qty, to_uom)`` with a memoized factor."""
+        if not from_uom or not to_uom:
+            return qty
+        key = (from_uom.id, to_uom.id)
+        factor = self._uom_factors.get(key)
+        if factor is None:
+            factor = self._uom_factors[key] = from_uom._compute_quantity(1.0, to_uom, round=False)
+        return float_round(qty * factor, precision_rounding=to_uom.rounding, rounding_method=rounding_method)
+
+    # ---------- Currencies ----------
+    def rate(self, from_currency, to_currency, company, date):
+        date = fields.Date.to_date(date)
+        key = (from_currency.id, to_currency.id, company.id, date)
+        rate = self._rates.get(key)
+        if rate is None:
+            rate = self._rates[key] = self._get_shared_rate(key, from_currency, to_currency, company, date)
+        return rate
+
+    def convert(self, amount, from_currency, to_currency, company, date):
+        """Same result as ``from_currency._convert(amount, to_currency, company, date)``."""
+        from_currency, to_currency = from_currency or to_currency, to_currency or from_currency
+        if not amount:
+            return 0.0
+        return to_currency.round(amount * self.rate(from_currency, to_currency, company, date))
+
+    def _get_shared_rate(self, key, from_currency, to_currency, company, date):
+        Currency = self.env["res.currency"]
+        if not self._rate_ttl:
+            return Currency._get_conversion_rate(from_currency, to_currency, company, date)
+        shared_key = (self.env.cr.dbname,) + key
+        now = time.monotonic()
+        with self._shared_lock:
+            cached = self._shared_rates.get(shared_key)
+        if cached and cached[0] > now:
+            return cached[1]
+        rate = Currency._get_conversion_rate(from_currency, to_currency, company, date)
+        with self._shared_lock:
+            self._shared_rates[shared_key] = (now + self._rate_ttl, rate)
+        return rate
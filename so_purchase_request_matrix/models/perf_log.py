@@ -0,0 +1,197 @@
+import functools
+import logging
+import random
+import time
+
+from odoo import api, fields, models, tools
+from odoo.tools import SQL
+
+_logger = logging.getLogger(__name__)
+
+
+def _iter_plan_nodes(node):
+    """Yield the node of an EXPLAIN (FORMAT JSON) plan and all its sub-nodes."""
+    yield node
+    for child in node.get("Plans", []):
+        yield from _iter_plan_nodes(child)
+
+
+def prq_instrument(stage):
+    """Decorate a purchase request method to record its timing under ``stage``.
+
+    Calls are sampled at the rate of the ``so_purchase_request_matrix.perf_sample_rate``
+    parameter (0 to 1, disabled by default). The wall time, SQL query count and rows
+    inserted by sampled calls are stored as ``so.purchase.request.perf.log`` records.
+    Model-level endpoints are attributed to the request whose id is their first argument.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            PerfLog = self.env["so.purchase.request.perf.log"].sudo()
+            if not PerfLog._is_sampled():
+                return method(self, *args, **kwargs)
+            cr = self.env.cr
+            rows = PerfLog._get_inserted_rows()
+            queries = cr.sql_log_count
+            start = time.perf_counter()
+            result = method(self, *args, **kwargs)
+            self.env.flush_all()
+            duration = time.perf_counter() - start
+            queries = cr.sql_log_count - queries
+            rows = PerfLog._get_inserted_rows() - rows
+            if self:
+                request_id = self.id if len(self) == 1 else False
+            else:
+                request_id = args[0] if args and isinstance(args[0], int) else kwargs.get("request_id", False)
+            PerfLog._log(stage, request_id, len(self) or 1, duration, queries, rows)
+            return result
+        return wrapper
+    return decorator
+
+
+class PurchaseRequestPerfLog(models.Model):
+    _name = "so.purchase.request.perf.log"
+    _description = "Purchase Request Performance Log"
+    _order = "date desc, id desc"
+    _log_access = False
+
+    date = fields.Datetime(string="Date", default=fields.Datetime.now, readonly=True, index=True)
+    stage = fields.Char(string="Stage", required=True, readonly=True, index=True)
+    request_id = fields.Many2one("so.purchase.request", string="Purchase Request", ondelete="set null", readonly=True)
+    user_id = fields.Many2one("res.users", string="User", default=lambda self: self.env.uid, readonly=True)
+    record_count = fields.Integer(string="Records", readonly=True)
+    duration = fields.Float(string="Duration (s)", digits=(16, 4), readonly=True)
+    query_count = fields.Integer(string="SQL Queries", readonly=True)
+    rows_created = fields.Integer(string="Rows Created", readonly=True)
+
+    @api.model
+    def _is_sampled(self):
+        rate = self.env["ir.config_parameter"].sudo().get_param("so_purchase_request_matrix.perf_sample_rate", 0)
+        try:
+            rate = float(rate)
+        except ValueError:
+            return False
+        return rate > 0 and random.random() < rate
+
+    @api.model
+    def _get_inserted_rows(self):
+        """Rows inserted by the current transaction so far, over all tables."""
+        self.env.flush_all()
+        self.env.cr.execute("SELECT COALESCE(SUM(n_tup_ins), 0) FROM pg_stat_xact_user_tables")
+        return self.env.cr.fetchone()[0]
+
+    @api.model
+    def _log(self, stage, request_id, record_count, duration, query_count, rows_created):
+        _logger.info(
+            "Purchase request stage %s (request %s): %.3fs, %s queries, %s rows created",
+            stage, request_id, duration, query_count, rows_created,
+        )
+        return self.create({
+            "stage": stage,
+            "request_id": request_id,
+            "record_count": record_count,
+            "duration": duration,
+            "query_count": query_count,
+            "rows_created": rows_created,
+        })
+
+    @api.model
+    def _get_hot_queries(self, request):
+        """The module's most frequent lookups, as (name, model name, domain) on ``request``."""
+        vendor_id = request.vendor_ids[:1].id
+        product_id = request.line_ids[:1].product_id.id
+        cell = [("request_id", "=", request.id), ("vendor_id", "=", vendor_id), ("product_id", "=", product_id)]
+        return [
+            ("quote_cell", "so.purchase.request.quote.line", cell),
+            ("quote_request_quoted", "so.purchase.request.quote.line", [("request_id", "=", request.id), ("price_unit_quote", ">", 0)]),
+            ("allocation_cell", "so.purchase.request.allocation", cell),
+            ("allocation_request", "so.purchase.request.allocation", [("request_id", "=", request.id)]),
+            ("request_line_product", "so.purchase.request.line", [("request_id", "=", request.id), ("product_id", "=", product_id)]),
+            ("request_rfqs", "purchase.order", [("so_request_id", "=", request.id), ("is_final_po", "=", False)]),
+            ("request_final_pos", "purchase.order", [("so_request_id", "=", request.id), ("is_final_po", "=", True)]),
+        ]
+
+    @api.model
+    def _explain_hot_queries(self, request, force_index=True):
+        """Run EXPLAIN ANALYZE on the hot lookups of ``request`` and report their sequential scans.
+
+        With ``force_index``, sequential scans are disabled for the planner, so that a scan
+        left in a plan means no index can serve the lookup, whatever the size of the tables.
+
+        :return: list of dicts with the ``name`` of the lookup, the tables read with a sequential
+                 scan (``seq_scans``), the execution time in milliseconds (``duration``) and the ``plan``
+        """
+        request.ensure_one()
+        cr = self.env.cr
+        lookups = self._get_hot_queries(request)
+        self.env.flush_all()
+        for table in {self.env[model_name]._table for _name, model_name, _domain in lookups}:
+            cr.execute(SQL("ANALYZE %s", SQL.identifier(table)))
+        if force_index:
+            cr.execute("SHOW enable_seqscan")
+            enable_seqscan = cr.fetchone()[0]
+            cr.execute("SET LOCAL enable_seqscan = off")
+        report = []
+        try:
+            for name, model_name, domain in lookups:
+                query = self.env[model_name].sudo()._search(domain)
+                cr.execute(SQL("EXPLAIN (ANALYZE, FORMAT JSON) %s", query.select()))
+                explain = cr.fetchone()[0][0]
+                seq_scans = sorted({
+                    node["Relation Name"] for node in _iter_plan_nodes(explain["Plan"]) if node["Node Type"] == "Seq Scan"
+                })
+                if seq_scans:
+                    _logger.warning("Purchase request lookup %s scans %s sequentially", name, ", ".join(seq_scans))
+                report.append({
+                    "name": name,
+                    "seq_scans": seq_scans,
+                    "duration": explain["Execution Time"],
+                    "plan": explain["Plan"],
+                })
+        finally:
+            if force_index:
+                cr.execute(SQL("SELECT set_config('enable_seqscan', %s, true)", enable_seqscan))
+        return report
+
+    @api.autovacuum
+    def _gc_perf_logs(self):
+        days = int(self.env["ir.config_parameter"].sudo().get_param("so_purchase_request_matrix.perf_log_retention_days", 30) or 30)
+        self.search([("date", "<", fields.Datetime.subtract(fields.Datetime.now(), days=days))]).unlink()
+
+
+class PurchaseRequestPerfReport(models.Model):
+    _name = "so.purchase.request.perf.report"
+    _description = "Purchase Request Performance Report"
+    _auto = False
+    _order = "stage"
+
+    stage = fields.Char(string="Stage", readonly=True)
+    call_count = fields.Integer(string="Calls", readonly=True)
+    avg_duration = fields.Float(string="Average (s)", digits=(16, 4), readonly=True)
+    p50_duration = fields.Float(string="P50 (s)", digits=(16, 4), readonly=True)
+    p90_duration = fields.Float(string="P90 (s)", digits=(16, 4), readonly=True)
+    p99_duration = fields.Float(string="P99 (s)", digits=(16, 4), readonly=True)
+    max_duration = fields.Float(string="Max (s)", digits=(16, 4), readonly=True)
+    p50_queries = fields.Float(string="P50 Queries", readonly=True)
+    p90_queries = fields.Float(string="P90 Queries", readonly=True)
+    avg_rows_created = fields.Float(string="Average Rows Created", readonly=True)
+
+    def init(self):
+        tools.drop_view_if_exists(self.env.cr, self._table)
+        self.env.cr.execute(f"""
+            CREATE OR REPLACE VIEW {self._table} AS (
+                SELECT MIN(id) AS id,
+                       stage,
+                       COUNT(*) AS call_count,
+                       AVG(duration) AS avg_duration,
+                       PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY duration) AS p50_duration,
+                       PERCENTILE_CONT(0.9) WITHIN GROUP (ORDER BY duration) AS p90_duration,
+                       PERCENTILE_CONT(0.99) WITHIN GROUP (ORDER BY duration) AS p99_duration,
+                       MAX(duration) AS max_duration,
+                       PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY query_count) AS p50_queries,
+                       PERCENTILE_CONT(0.9) WITHIN GROUP (ORDER BY query_count) AS p90_queries,
+                       AVG(rows_created) AS avg_rows_created
+                  FROM so_purchase_request_perf_log
+              GROUP BY stage
+            )
+        """)
@@ -0,0 +1,131 @@
+from odoo import api, fields, models
+
+# Most recent prices of a (vendor, product, UoM, currency) the statistics are computed over
+PRICE_HISTORY_WINDOW = 20
+
+
+class PurchaseRequestPriceHistory(models.Model):
+    _name = "so.purchase.request.price.history"
+    _description = "Vendor Price History"
+    _order = "vendor_id, product_id"
+    _log_access = False
+
+    vendor_id = fields.Many2one("res.partner", string="Vendor", required=True, ondelete="cascade", readonly=True)
+    product_id = fields.Many2one("product.product", string="Product", required=True, ondelete="cascade", readonly=True)
+    uom_id = fields.Many2one("uom.uom", string="UoM", required=True, ondelete="cascade", readonly=True)
+    currency_id = fields.Many2one("res.currency", string="Currency", required=True, ondelete="cascade", readonly=True)
+    sample_count = fields.Integer(string="Prices", readonly=True)
+    price_median = fields.Monetary(string="Median Price", readonly=True)
+    price_mean = fields.Monetary(string="Average Price", readonly=True)
+    price_min = fields.Monetary(string="Lowest Price", readonly=True)
+    price_max = fields.Monetary(string="Highest Price", readonly=True)
+    price_stddev = fields.Float(string="Standard Deviation", readonly=True)
+    last_price = fields.Monetary(string="Last Price", readonly=True)
+    last_date = fields.Datetime(string="Last Price Date", readonly=True)
+
+    _sql_constraints = [
+        ("key_unique", "unique(vendor_id, product_id, uom_id, currency_id)",
+         "The price history is unique per vendor, product, UoM and currency."),
+    ]
+
+    @api.model
+    def _rebuild(self, vendor_ids=None, product_ids=None):
+        """Recompute the statistics from past quotes and final PO lines in a single statement.
+
+        Only the quotes of requests that reached ``po_created`` are taken into account; the
+        expected prices of RFQs are kept apart from their unit price and never feed the history
+        back. Once a request is archived, the lines of its archived RFQs replace its deleted
+        quote lines. The matrices of the open requests quoting the rebuilt keys are reloaded.
+
+        Statistics cover the ``so_purchase_request_matrix.price_history_window`` most recent
+        prices of each key. Without filters the whole table is rebuilt; with ``vendor_ids``
+        and ``product_ids`` only the keys of those vendors and products are upserted.
+        """
+        self.env.flush_all()
+        window = int(self.env["ir.config_parameter"].sudo().get_param(
+            "so_purchase_request_matrix.price_history_window", PRICE_HISTORY_WINDOW) or PRICE_HISTORY_WINDOW)
+        params = {"window": window, "vendor_ids": tuple(vendor_ids or [0]), "product_ids": tuple(product_ids or [0])}
+        restricted = vendor_ids is not None or product_ids is not None
+        quote_filter = order_filter = ""
+        if vendor_ids is not None:
+            quote_filter += " AND ql.vendor_id IN %(vendor_ids)s"
+            order_filter += " AND po.partner_id IN %(vendor_ids)s"
+        if product_ids is not None:
+            quote_filter += " AND ql.product_id IN %(product_ids)s"
+            order_filter += " AND pol.product_id IN %(product_ids)s"
+        if not restricted:
+            self.env.cr.execute(f"DELETE FROM {self._table}")
+        self.env.cr.execute(f"""
+            WITH observations AS (
+                SELECT ql.vendor_id, ql.product_id, ql.product_uom_id AS uom_id, ql.currency_id,
+                       ql.price_unit_quote AS price, COALESCE(rfq.date_order, ql.write_date) AS date
+                  FROM so_purchase_request_quote_line ql
+                  JOIN so_purchase_request request ON request.id = ql.request_id
+             LEFT JOIN purchase_order rfq ON rfq.id = ql.source_rfq_id
+                 WHERE request.state = 'po_created' AND ql.price_unit_quote > 0{quote_filter}
+             UNION ALL
+                SELECT po.partner_id, pol.product_id, pol.product_uom, po.currency_id, pol.price_unit, po.date_order
+                  FROM purchase_order_line pol
+                  JOIN purchase_order po ON po.id = pol.order_id
+                 WHERE po.is_final_po AND po.state != 'cancel' AND pol.price_unit > 0 AND pol.product_id IS NOT NULL{order_filter}
+             UNION ALL
+                SELECT po.partner_id, pol.product_id, pol.product_uom, po.currency_id, pol.price_unit, po.date_order
+                  FROM purchase_order_line pol
+                  JOIN purchase_order po ON po.id = pol.order_id
+                  JOIN so_purchase_request request ON request.id = po.so_request_id
+                 WHERE request.is_archived AND request.state = 'po_created' AND NOT po.active AND po.is_final_po IS NOT TRUE
+                   AND pol.price_unit > 0 AND pol.product_id IS NOT NULL{order_filter}
+            ), ranked AS (
+                SELECT *, ROW_NUMBER() OVER (PARTITION BY vendor_id, product_id, uom_id, currency_id ORDER BY date DESC) AS rank
+                  FROM observations
+            )
+            INSERT INTO {self._table} (vendor_id, product_id, uom_id, currency_id, sample_count, price_median, price_mean,
+                                       price_min, price_max, price_stddev, last_price, last_date)
+                 SELECT vendor_id, product_id, uom_id, currency_id, COUNT(*),
+                        PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY price), AVG(price), MIN(price), MAX(price),
+                        COALESCE(STDDEV_SAMP(price), 0), (ARRAY_AGG(price ORDER BY date DESC))[1], MAX(date)
+                   FROM ranked
+                  WHERE rank <= %(window)s
+               GROUP BY vendor_id, product_id, uom_id, currency_id
+            ON CONFLICT (vendor_id, product_id, uom_id, currency_id) DO UPDATE SET
+                   sample_count = EXCLUDED.sample_count,
+                   price_median = EXCLUDED.price_median,
+                   price_mean = EXCLUDED.price_mean,
+                   price_min = EXCLUDED.price_min,
+                   price_max = EXCLUDED.price_max,
+                   price_stddev = EXCLUDED.price_stddev,
+                   last_price = EXCLUDED.last_price,
+                   last_date = EXCLUDED.last_date
+        """, params)
+        self.invalidate_model()
+        quote_domain = [("request_id.state", "not in", ("po_created", "cancel"))]
+        if vendor_ids is not None:
+            quote_domain.append(("vendor_id", "in", list(vendor_ids)))
+        if product_ids is not None:
+            quote_domain.append(("product_id", "in", list(product_ids)))
+        requests = self.env["so.purchase.request"].browse(
+            request.id for request, in self.env["so.purchase.request.quote.line"]._read_group(quote_domain, ["request_id"])
+        )
+        requests._mark_matrix_dirty()
+
+    @api.model
+    def _cron_rebuild(self):
+        self._rebuild()
+        return True
+
+    @api.model
+    def _get_medians(self, vendor_ids, product_ids):
+        """Median prices of the given vendors and products, loaded with a single query.
+
+        :return: dict {(vendor_id, product_id, uom_id, currency_id): median price}
+        """
+        if not vendor_ids or not product_ids:
+            return {}
+        return {
+            (history["vendor_id"], history["product_id"], history["uom_id"], history["currency_id"]): history["price_median"]
+            for history in self.search_read(
+                [("vendor_id", "in", list(vendor_ids)), ("product_id", "in", list(product_ids))],
+                ["vendor_id", "product_id", "uom_id", "currency_id", "price_median"],
+                load=None,
+            )
+        }
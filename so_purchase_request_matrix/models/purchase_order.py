@@ -1,4 +1,15 @@
-from odoo import fields, models
+from odoo import api, fields, models
+from odoo.tools.sql import create_index
+
+# purchase.order / purchase.order.line fields feeding so.purchase.request.quote.line
+QUOTE_SYNC_ORDER_FIELDS = {"partner_id", "currency_id", "date_order", "notes", "so_quote_validity_date"}
+QUOTE_SYNC_LINE_FIELDS = {"product_id", "product_uom", "product_qty", "price_unit", "taxes_id", "order_id", "date_planned"}
+# fields shown in the vendor header of the comparison matrix
+MATRIX_HEADER_ORDER_FIELDS = {"partner_id", "payment_term_id", "so_request_id", "active"}
+MATRIX_HEADER_LINE_FIELDS = {"date_planned", "order_id"}
+# fields feeding so.purchase.request.vendor.summary
+VENDOR_SUMMARY_ORDER_FIELDS = {"partner_id", "payment_term_id", "so_request_id", "active", "currency_id", "is_final_po"}
+VENDOR_SUMMARY_LINE_FIELDS = {"date_planned", "order_id", "product_qty", "price_unit", "discount", "taxes_id"}
 
 
 class PurchaseOrder(models.Model):
@@ -8,3 +19,97 @@ class PurchaseOrder(models.Model):
     so_from_request = fields.Boolean(string="Created From Purchase Request", default=False)
     is_final_po = fields.Boolean(string="Final PO", default=False)
     active = fields.Boolean(string="Active", default=True)
+    so_quote_validity_date = fields.Date(string="Quote Valid Until", copy=False,
+                                         help="Last day the vendor's quoted prices are valid, as stated in their reply.")
+
+    def init(self):
+        super().init()
+        # RFQs and final POs of live requests; archived RFQs and orders without request stay out of it
+        create_index(self.env.cr, "purchase_order_so_request_final_index", self._table, ["so_request_id", "is_final_po"],
+                     where="so_request_id IS NOT NULL AND active")
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        orders = super().create(vals_list)
+        orders.so_request_id._mark_matrix_dirty()
+        orders._prq_mark_vendor_summary_dirty()
+        return orders
+
+    def write(self, vals):
+        requests = self.so_request_id
+        summary_changed = not VENDOR_SUMMARY_ORDER_FIELDS.isdisjoint(vals)
+        if summary_changed:
+            # the summaries the orders leave must be refreshed as well
+            self._prq_mark_vendor_summary_dirty(include_final=True)
+        res = super().write(vals)
+        if not QUOTE_SYNC_ORDER_FIELDS.isdisjoint(vals):
+            self.order_line._prq_mark_quote_cells_dirty()
+        if not MATRIX_HEADER_ORDER_FIELDS.isdisjoint(vals):
+            (requests | self.so_request_id)._mark_matrix_dirty()
+        if summary_changed:
+            self._prq_mark_vendor_summary_dirty(include_final=True)
+        return res
+
+    def _prq_mark_vendor_summary_dirty(self, include_final=False):
+        """Flag the vendor summaries of the RFQs in ``self`` for a refresh."""
+        pairs = {
+            (order.so_request_id.id, order.partner_id.id)
+            for order in self
+            if order.so_request_id and (include_final or not order.is_final_po)
+        }
+        if pairs:
+            self.so_request_id._mark_vendor_summary_dirty(pairs)
+
+
+class PurchaseOrderLine(models.Model):
+    _inherit = "purchase.order.line"
+
+    so_sale_line_id = fields.Many2one("sale.order.line", string="Sales Order Line", ondelete="set null", index="btree_not_null", copy=False,
+                                      help="Sales Order line served by this line of a consolidated purchase request.")
+    so_expected_price = fields.Monetary(string="Expected Price", currency_field="currency_id", readonly=True, copy=False,
+                                        help="Historical median price of the vendor when the RFQ was created from a purchase request.")
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        lines = super().create(vals_list)
+        lines._prq_mark_quote_cells_dirty()
+        lines.order_id.so_request_id._mark_matrix_dirty()
+        lines.order_id._prq_mark_vendor_summary_dirty()
+        return lines
+
+    def write(self, vals):
+        header_changed = not MATRIX_HEADER_LINE_FIELDS.isdisjoint(vals)
+        quotes_changed = not QUOTE_SYNC_LINE_FIELDS.isdisjoint(vals)
+        summary_changed = not VENDOR_SUMMARY_LINE_FIELDS.isdisjoint(vals)
+        requests = self.order_id.so_request_id
+        if quotes_changed:
+            # the cells the lines leave (product or order change) must be refreshed as well
+            self._prq_mark_quote_cells_dirty()
+        if summary_changed:
+            self.order_id._prq_mark_vendor_summary_dirty()
+        res = super().write(vals)
+        if quotes_changed:
+            self._prq_mark_quote_cells_dirty()
+        if header_changed:
+            (requests | self.order_id.so_request_id)._mark_matrix_dirty()
+        if summary_changed:
+            self.order_id._prq_mark_vendor_summary_dirty()
+        return res
+
+    def unlink(self):
+        self._prq_mark_quote_cells_dirty()
+        self.order_id.so_request_id._mark_matrix_dirty()
+        self.order_id._prq_mark_vendor_summary_dirty()
+        return super().unlink()
+
+    def _prq_mark_quote_cells_dirty(self):
+        """Flag the quote cells of the RFQ lines in ``self`` for an incremental quote sync."""
+        if self.env.context.get("prq_skip_quote_sync"):
+            return
+        cells = {
+            (line.order_id.so_request_id.id, line.order_id.partner_id.id, line.product_id.id)
+            for line in self
+            if line.order_id.so_request_id and not line.order_id.is_final_po and line.product_id
+        }
+        if cells:
+            self.env["so.purchase.request"]._mark_quote_cells_dirty(cells)
@@ -1,5 +1,76 @@
-from odoo import api, fields, models, _
+import logging
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from markupsafe import Markup
+
+from odoo import SUPERUSER_ID, api, fields, models, _
 from odoo.exceptions import ValidationError, UserError
+from odoo.tools import config, split_every
+from odoo.tools.sql import create_index, drop_index, make_index_name
+from odoo.tools.lru import LRU
+
+from .allocation_solver import solve_allocation
+from .normalization_cache import NormalizationCache
+from .perf_log import prq_instrument
+
+_logger = logging.getLogger(__name__)
+
+# Number of purchase.order.line rows created per ``create`` call when generating RFQs
+RFQ_LINE_BATCH_SIZE = 1000
+
+# so.purchase.request fields whose change requires open matrices to reload
+MATRIX_FIELDS = {"vendor_ids", "line_ids", "quote_line_ids", "allocation_ids", "approval_split_by_vendor", "company_id"}
+# quote line / allocation fields identifying a matrix cell
+MATRIX_CELL_FIELDS = {"request_id", "product_id", "vendor_id"}
+# quote line fields feeding so.purchase.request.vendor.summary
+VENDOR_SUMMARY_QUOTE_FIELDS = {"request_id", "product_id", "vendor_id", "price_unit_quote"}
+
+# Process-wide cache of matrix payloads keyed by request, matrix_version and window
+MATRIX_SNAPSHOT_CACHE_SIZE = 256
+_matrix_snapshots = LRU(MATRIX_SNAPSHOT_CACHE_SIZE)
+
+# Request lines read per window when exporting the matrix, and file rows upserted per chunk on import
+MATRIX_EXPORT_BATCH_SIZE = 500
+QUOTE_IMPORT_CHUNK_SIZE = 1000
+# Columns of the matrix export preceding the vendor price columns
+MATRIX_EXPORT_FIXED_COLUMNS = 4
+
+# Completed requests archived per run of the retention cron, and default age in days before archiving
+ARCHIVE_BATCH_SIZE = 50
+ARCHIVE_AFTER_DAYS = 180
+
+
+def _freeze_vals(vals):
+    """Return a hashable version of a ``write`` values dict, used to group identical writes."""
+    def freeze(value):
+        if isinstance(value, (list, tuple)):
+            return tuple(freeze(item) for item in value)
+        return value
+    return tuple(sorted((name, freeze(value)) for name, value in vals.items()))
+
+
+def _is_price_outlier(price, median, threshold):
+    """Whether ``price`` deviates from the historical ``median`` by more than ``threshold`` (relative)."""
+    return bool(median and price and threshold > 0 and abs(price - median) / median > threshold)
+
+
+def _get_changed_vals(record, vals):
+    """Return the subset of ``vals`` that would actually change ``record``."""
+    record.ensure_one()
+    changes = {}
+    for name, value in vals.items():
+        field = record._fields[name]
+        new_value = field.convert_to_cache(value, record)
+        old_value = field.convert_to_cache(record[name], record)
+        if field.type in ("one2many", "many2many"):
+            if set(new_value) != set(old_value):
+                changes[name] = value
+        elif new_value != old_value:
+            changes[name] = value
+    return changes
 
 
 class PurchaseRequest(models.Model):
@@ -9,7 +80,11 @@ class PurchaseRequest(models.Model):
     _order = "id desc"
 
     name = fields.Char(string="Request Number", tracking=True, default="/", copy=False, readonly=True)
-    sale_order_id = fields.Many2one("sale.order", string="Sales Order", required=True, ondelete="restrict", index=True)
+    sale_order_id = fields.Many2one("sale.order", string="Sales Order", ondelete="restrict", index=True)
+    is_consolidated = fields.Boolean(string="Consolidated", readonly=True, copy=False,
+                                     help="Aggregates the demand of several Sales Orders; final PO lines are split back per Sales Order line.")
+    sale_order_ids = fields.Many2many("sale.order", "so_prq_sale_order_rel", "request_id", "sale_order_id",
+                                      string="Sales Orders", readonly=True, copy=False)
     state = fields.Selection([
         ("draft", "Draft"),
         ("vendors_selected", "Vendors Selected"),
@@ -26,21 +101,54 @@ class PurchaseRequest(models.Model):
                                   string="Vendors")
     line_ids = fields.One2many("so.purchase.request.line", "request_id", string="Lines")
     rfq_ids = fields.One2many("purchase.order", "so_request_id", string="RFQs")
+    archived_rfq_ids = fields.One2many("purchase.order", "so_request_id", string="Archived RFQs",
+                                       domain=[("is_final_po", "=", False), ("active", "=", False)], context={"active_test": False})
     not_final_po_ids = fields.One2many("purchase.order", "so_request_id", string="Not Final POs", domain=[("is_final_po", "=", False)])
     final_po_ids = fields.One2many("purchase.order", "so_request_id", string="Final POs", domain=[("is_final_po", "=", True)])
     quote_line_ids = fields.One2many("so.purchase.request.quote.line", "request_id", string="Quote Lines")
     allocation_ids = fields.One2many("so.purchase.request.allocation", "request_id", string="Allocations")
     approval_split_by_vendor = fields.Boolean(string="Allow Split By Vendor", help="If enabled, approver can split quantities per product across vendors.")
     note = fields.Text(string="Internal Note")
+    solver_max_vendors = fields.Integer(string="Max Vendors", help="Maximum number of vendors used by the optimal allocation (0 for no limit).")
+    solver_min_order_value = fields.Monetary(string="Min Order Value", currency_field="currency_id",
+                                             help="Minimum value ordered from each vendor used by the optimal allocation.")
+    solver_max_lead_time = fields.Integer(string="Max Lead Time (days)",
+                                         help="Ignore quotes expecting delivery more days after the RFQ date (0 for no limit).")
+    solver_skip_expired_quotes = fields.Boolean(string="Ignore Expired Quotes", default=True,
+                                                help="Ignore quotes whose RFQ has a validity date in the past.")
+    quote_sync_pending = fields.Boolean(string="Quote Sync Pending", copy=False,
+                                        help="RFQ lines changed since the last quote sync; picked up by the quote sync cron.")
+    matrix_version = fields.Integer(string="Matrix Version", default=0, copy=False, readonly=True,
+                                    help="Bumped once per transaction changing the comparison matrix.")
     comparison_matrix = fields.Text(string="Comparison Matrix (UI)", compute="_compute_matrix_placeholder")
+    run_in_background = fields.Boolean(string="Run in Background",
+                                       help="Create RFQs, sync quotes and create POs with background jobs, one per vendor, "
+                                            "instead of within the button click.")
+    job_ids = fields.One2many("so.purchase.request.job", "request_id", string="Background Jobs")
+    is_archived = fields.Boolean(string="Archived", readonly=True, copy=False, index=True,
+                                 help="Superseded RFQs archived and quote lines compacted into the vendor ranking by the retention cron.")
+    vendor_summary_ids = fields.One2many("so.purchase.request.vendor.summary", "request_id", string="Vendor Ranking")
+    job_running = fields.Boolean(string="Jobs Running", compute="_compute_job_progress")
+    job_progress = fields.Float(string="Progress", compute="_compute_job_progress")
 
     _sql_constraints = [
         ("sale_order_unique", "unique(sale_order_id)", "A Purchase Request already exists for this Sales Order."),
     ]
 
+    @api.constrains("sale_order_id", "is_consolidated")
+    def _check_sale_order(self):
+        for request in self:
+            if not request.is_consolidated and not request.sale_order_id:
+                raise ValidationError(_("A Purchase Request must be linked to a Sales Order."))
+
     def write(self, vals):
         res = super().write(vals)
-        self._bus_send_matrix_update()
+        if not MATRIX_FIELDS.isdisjoint(vals):
+            self._mark_matrix_dirty()
+        if "vendor_ids" in vals:
+            self._mark_vendor_summary_dirty()
+        if vals.get("state") == "po_created":
+            self._schedule_price_history_rebuild()
         return res
 
     @api.depends_context("id")
@@ -48,6 +156,14 @@ class PurchaseRequest(models.Model):
         for rec in self:
             rec.comparison_matrix = "matrix"
 
+    @api.depends("job_ids.state")
+    def _compute_job_progress(self):
+        for request in self:
+            jobs = request.sudo().job_ids
+            request.job_running = any(job.state == "pending" for job in jobs)
+            done = len(jobs.filtered(lambda j: j.state == "done"))
+            request.job_progress = 100.0 * done / len(jobs) if jobs else 0.0
+
     @api.model_create_multi
     def create(self, vals_list):
         for vals in vals_list:
@@ -55,7 +171,64 @@ class PurchaseRequest(models.Model):
                 vals["name"] = self.env["ir.sequence"].next_by_code("so.purchase.request") or "/"
         return super().create(vals_list)
 
+    @api.model
+    def _get_next_names(self, count):
+        """Reserve ``count`` request numbers at once.
+
+        Standard sequences without date ranges draw all the numbers with a single query;
+        other sequences fall back to one ``next_by_code`` per number.
+        """
+        IrSequence = self.env["ir.sequence"]
+        sequence = IrSequence.sudo().search([
+            ("code", "=", "so.purchase.request"),
+            ("company_id", "in", [self.env.company.id, False]),
+        ], order="company_id", limit=1)
+        if not sequence or sequence.implementation != "standard" or sequence.use_date_range:
+            return [IrSequence.next_by_code("so.purchase.request") or "/" for _index in range(count)]
+        self.env.cr.execute("SELECT nextval(%s) FROM generate_series(1, %s)", ["ir_sequence_%03d" % sequence.id, count])
+        return [sequence.get_next_char(number) for number, in self.env.cr.fetchall()]
+
+    def _prepare_line_from_sale_line(self, so_line):
+        self.ensure_one()
+        uom = so_line.product_uom or so_line.product_id.uom_po_id
+        return {
+            "request_id": self.id,
+            "product_id": so_line.product_id.id,
+            "product_uom_id": uom.id,
+            "qty_request": so_line.product_uom_qty,
+            "description": so_line.name,
+            "sale_line_ids": [(6, 0, so_line.ids)],
+        }
+
+    def _prepare_lines_from_sale_lines_consolidated(self, so_lines):
+        """One request line per product, summing the demand of ``so_lines``.
+
+        The quantities are expressed in the UoM of the first sale line of each product,
+        and every request line keeps track of the sale lines it aggregates.
+        """
+        self.ensure_one()
+        cache = NormalizationCache(self.env)
+        lines_vals = {}
+        for so_line in so_lines:
+            product = so_line.product_id
+            uom = so_line.product_uom or product.uom_po_id
+            vals = lines_vals.get(product.id)
+            if vals is None:
+                vals = lines_vals[product.id] = {
+                    "request_id": self.id,
+                    "product_id": product.id,
+                    "product_uom_id": uom.id,
+                    "qty_request": 0.0,
+                    "description": product.display_name,
+                    "sale_line_ids": [(6, 0, [])],
+                }
+            line_uom = self.env["uom.uom"].browse(vals["product_uom_id"])
+            vals["qty_request"] += cache.quantity(so_line.product_uom_qty, uom, line_uom)
+            vals["sale_line_ids"][0][2].append(so_line.id)
+        return list(lines_vals.values())
+
     # ---------- Actions ----------
+    @prq_instrument("action_select_vendors")
     def action_select_vendors(self):
         self.ensure_one()
         if not self.vendor_ids:
@@ -75,83 +248,373 @@ class PurchaseRequest(models.Model):
         }
 
     def _prepare_rfq_line_vals(self, line, order):
+        vals = self._prepare_rfq_line_base_vals(line)
+        vals["order_id"] = order.id
+        return vals
+
+    def _prepare_rfq_line_base_vals(self, line, date_planned=None):
+        """Vendor-independent part of an RFQ line, computed once per request line."""
         product = line.product_id
         uom = line.product_uom_id or product.uom_po_id
         qty = line.qty_request
         return {
-            "order_id": order.id,
             "product_id": product.id,
             "name": line.description or product.display_name,
             "product_uom": uom.id,
             "product_qty": qty,
             "price_unit": 0.0,
-            "date_planned": fields.Date.context_today(self),
+            "date_planned": date_planned or fields.Date.context_today(self),
             "taxes_id": [(6, 0, product.supplier_taxes_id.ids)],
         }
 
+    def _create_rfqs_batched(self, vendors=None):
+        """Create the RFQs of all requests in ``self`` with batched ``create`` calls.
+
+        Orders are created in one call for every (request, vendor) pair, then
+        their lines in chunks of ``RFQ_LINE_BATCH_SIZE``. The vendor-independent
+        line values are prepared once per request line and reused for every vendor.
+
+        :param vendors: restrict the RFQs to these vendors of the requests
+        """
+        PurchaseOrder = self.env["purchase.order"]
+        PurchaseOrderLine = self.env["purchase.order.line"]
+        date_planned = fields.Date.context_today(self)
+        medians = self.env["so.purchase.request.price.history"]._get_medians(
+            (self.vendor_ids if vendors is None else self.vendor_ids & vendors).ids, self.line_ids.product_id.ids,
+        )
+        order_vals_list = []
+        base_vals_per_order = []
+        for request in self:
+            base_vals = [request._prepare_rfq_line_base_vals(line, date_planned) for line in request.line_ids]
+            request_vendors = request.vendor_ids if vendors is None else request.vendor_ids & vendors
+            for vendor in request_vendors:
+                order_vals_list.append(request._prepare_rfq_vals(vendor))
+                base_vals_per_order.append(base_vals)
+        orders = PurchaseOrder.create(order_vals_list)
+        line_vals_list = []
+        for order, order_vals, base_vals in zip(orders, order_vals_list, base_vals_per_order):
+            for vals in base_vals:
+                line_vals = dict(vals, order_id=order.id)
+                line_vals["taxes_id"] = [(6, 0, list(vals["taxes_id"][0][2]))]
+                # expected price from the vendor's price history, if any; the unit price is left to the vendor
+                key = (order_vals["partner_id"], vals["product_id"], vals["product_uom"], order_vals["currency_id"])
+                line_vals["so_expected_price"] = medians.get(key, 0.0)
+                line_vals_list.append(line_vals)
+        # quote lines of new RFQs come from the first sync
+        PurchaseOrderLine = PurchaseOrderLine.with_context(prq_skip_quote_sync=True)
+        for batch in split_every(RFQ_LINE_BATCH_SIZE, line_vals_list, list):
+            PurchaseOrderLine.create(batch)
+        return orders
+
+    @prq_instrument("action_create_rfqs")
     def action_create_rfqs(self):
         for request in self:
             if not request.vendor_ids:
                 raise UserError(_("Please select at least one vendor."))
-            created_orders = self.env["purchase.order"]
-            for vendor in request.vendor_ids:
-                po_vals = request._prepare_rfq_vals(vendor)
-                po = self.env["purchase.order"].create(po_vals)
-                # po.active = False
-                for line in request.line_ids:
-                    self.env["purchase.order.line"].create(request._prepare_rfq_line_vals(line, po))
-                created_orders |= po
-            request.state = "rfqs_created"
+        background = self.filtered("run_in_background")
+        background._enqueue_jobs("create_rfqs")
+        foreground = self - background
+        if foreground:
+            vendors_by_request = {request: request.vendor_ids for request in foreground}
+            if not foreground._generate_per_vendor_in_parallel("_create_missing_rfqs", vendors_by_request):
+                foreground._create_rfqs_batched()
+            foreground.write({"state": "rfqs_created"})
         return True
 
-    def action_sync_quotes(self):
+    def _create_missing_rfqs(self, vendors):
+        """Create the RFQs of the ``vendors`` that have none yet, safe to run again after a partial run."""
+        self.ensure_one()
+        vendors -= self.not_final_po_ids.partner_id
+        if not vendors:
+            return self.env["purchase.order"]
+        return self._create_rfqs_batched(vendors=vendors)
+
+    def _prepare_quote_line_vals(self, order, order_line):
+        self.ensure_one()
+        lead_time = 0
+        if order_line.date_planned and order.date_order:
+            lead_time = max((order_line.date_planned.date() - order.date_order.date()).days, 0)
+        return {
+            "request_id": self.id,
+            "vendor_id": order.partner_id.id,
+            "product_id": order_line.product_id.id,
+            "product_uom_id": order_line.product_uom.id,
+            "qty_quote": order_line.product_qty,
+            "price_unit_quote": order_line.price_unit,
+            "currency_id": order.currency_id.id,
+            "taxes_id": [(6, 0, order_line.taxes_id.ids)],
+            "lead_time_days": lead_time,
+            "validity_date": order.so_quote_validity_date,
+            "vendor_note": order.notes or False,
+            "source_rfq_id": order.id,
+        }
+
+    def _sync_quote_lines(self, cells=None, vendors=None):
+        """Upsert the quote lines of the requests in ``self`` from their RFQ lines.
+
+        Quote lines synced from an RFQ line that no longer exists are deleted.
+
+        :param cells: optional set of (request_id, vendor_id, product_id) restricting
+                      the sync to those cells
+        :param vendors: optional recordset restricting the sync to the RFQs of these vendors
+        """
+        target = {}
+        QuoteLine = self.env["so.purchase.request.quote.line"]
+        if cells is not None:
+            # only read the RFQ lines of the dirty cells, not the whole request
+            domain = [
+                ("order_id.so_request_id", "in", self.ids),
+                ("order_id.is_final_po", "=", False),
+                ("order_id.partner_id", "in", list({cell[1] for cell in cells})),
+                ("product_id", "in", list({cell[2] for cell in cells})),
+            ]
+            if vendors is not None:
+                domain.append(("order_id.partner_id", "in", vendors.ids))
+            for pol in self.env["purchase.order.line"].search(domain):
+                po = pol.order_id
+                key = (po.so_request_id.id, po.partner_id.id, pol.product_id.id)
+                if key in cells:
+                    target[key] = po.so_request_id._prepare_quote_line_vals(po, pol)
+            stale = QuoteLine.search([
+                ("request_id", "in", self.ids),
+                ("vendor_id", "in", list({cell[1] for cell in cells})),
+                ("product_id", "in", list({cell[2] for cell in cells})),
+                ("source_rfq_id", "!=", False),
+            ]).filtered(lambda ql: (ql.request_id.id, ql.vendor_id.id, ql.product_id.id) in cells)
+            self._unlink_stale_quote_lines(stale, target)
+            return self._upsert_quote_lines(target)
         for request in self:
-            for po in request.rfq_ids:
+            rfqs = request.rfq_ids
+            if vendors is not None:
+                rfqs = rfqs.filtered(lambda po: po.partner_id in vendors)
+            for po in rfqs:
                 for pol in po.order_line:
-                    # upsert quote line by (request, vendor, product)
-                    ql = self.env["so.purchase.request.quote.line"].search([
-                        ("request_id", "=", request.id),
-                        ("vendor_id", "=", po.partner_id.id),
-                        ("product_id", "=", pol.product_id.id),
-                    ], limit=1)
-                    vals = {
-                        "request_id": request.id,
-                        "vendor_id": po.partner_id.id,
-                        "product_id": pol.product_id.id,
-                        "product_uom_id": pol.product_uom.id,
-                        "qty_quote": pol.product_qty,
-                        "price_unit_quote": pol.price_unit,
-                        "currency_id": po.currency_id.id,
-                        "taxes_id": [(6, 0, pol.taxes_id.ids)],
-                        "lead_time_days": 0,
-                        "validity_date": po.date_order and po.date_order.date(),
-                        "vendor_note": po.notes or False,
-                        "source_rfq_id": po.id,
-                    }
-                    if ql:
-                        ql.write(vals)
-                    else:
-                        self.env["so.purchase.request.quote.line"].create(vals)
-        
-        self._bus_send_matrix_update()
+                    if not pol.product_id:
+                        continue
+                    target[(request.id, po.partner_id.id, pol.product_id.id)] = request._prepare_quote_line_vals(po, pol)
+        domain = [("request_id", "in", self.ids), ("source_rfq_id", "!=", False)]
+        if vendors is not None:
+            domain.append(("vendor_id", "in", vendors.ids))
+        self._unlink_stale_quote_lines(QuoteLine.search(domain), target)
+        return self._upsert_quote_lines(target)
+
+    def _unlink_stale_quote_lines(self, quote_lines, target):
+        """Delete the ``quote_lines`` synced from an RFQ whose cell is missing from ``target``."""
+        quote_lines.filtered(
+            lambda ql: (ql.request_id.id, ql.vendor_id.id, ql.product_id.id) not in target
+        ).unlink()
+
+    def _upsert_quote_lines(self, target):
+        """Create or update the quote lines of the requests in ``self`` to match ``target``.
+
+        Existing quote lines of the target products are loaded once and indexed by
+        (request, vendor, product); missing ones are created in a single batch and
+        existing ones are only written when their values differ, grouped by identical changes.
+
+        :param target: dict {(request_id, vendor_id, product_id): quote line values}
+        """
+        QuoteLine = self.env["so.purchase.request.quote.line"]
+        if not target:
+            return True
+        existing = {
+            (ql.request_id.id, ql.vendor_id.id, ql.product_id.id): ql
+            for ql in QuoteLine.search([
+                ("request_id", "in", list({key[0] for key in target})),
+                ("vendor_id", "in", list({key[1] for key in target})),
+                ("product_id", "in", list({key[2] for key in target})),
+            ])
+        }
+        to_create = []
+        to_write = {}
+        for key, vals in target.items():
+            ql = existing.get(key)
+            if not ql:
+                to_create.append(vals)
+                continue
+            changes = _get_changed_vals(ql, vals)
+            if changes:
+                to_write.setdefault(_freeze_vals(changes), (changes, []))[1].append(ql.id)
+        if to_create:
+            QuoteLine.create(to_create)
+        for changes, ids in to_write.values():
+            QuoteLine.browse(ids).write(changes)
+        return True
+
+    @prq_instrument("action_sync_quotes")
+    def action_sync_quotes(self):
+        background = self.filtered("run_in_background")
+        background._enqueue_jobs("sync_quotes")
+        (self - background)._sync_quote_lines()
+        return True
+
+    @api.model
+    def _mark_quote_cells_dirty(self, cells):
+        """Schedule the (request_id, vendor_id, product_id) ``cells`` for a quote sync.
+
+        By default the cells are coalesced and upserted once, right before the current
+        transaction commits. With the ``so_purchase_request_matrix.quote_sync_mode``
+        parameter set to ``cron``, the requests are flagged and synced by a cron instead.
+        """
+        # called from RFQ hooks by purchase users who may not read the requests
+        requests = self.sudo().browse({cell[0] for cell in cells}).filtered(
+            lambda r: r.state not in ("po_created", "cancel")
+        )
+        cells = {cell for cell in cells if cell[0] in requests.ids}
+        if not cells:
+            return
+        mode = self.env["ir.config_parameter"].sudo().get_param("so_purchase_request_matrix.quote_sync_mode", "transaction")
+        if mode == "cron":
+            requests.filtered(lambda r: not r.quote_sync_pending).write({"quote_sync_pending": True})
+            cron = self.env.ref("so_purchase_request_matrix.ir_cron_prq_sync_pending_quotes", raise_if_not_found=False)
+            if cron:
+                cron.sudo()._trigger()
+            return
+        dirty = self.env.cr.precommit.data.setdefault("so_prq.dirty_quote_cells", set())
+        if not dirty:
+            self.env.cr.precommit.add(self.sudo()._flush_dirty_quote_cells)
+        dirty.update(cells)
+
+    def _flush_dirty_quote_cells(self):
+        cells = self.env.cr.precommit.data.pop("so_prq.dirty_quote_cells", set())
+        requests = self.browse({cell[0] for cell in cells}).exists()
+        if requests:
+            requests._sync_quote_lines(cells=cells)
+            self.env.flush_all()
+
+    @api.model
+    def _cron_sync_pending_quotes(self, limit=50):
+        requests = self.search([("quote_sync_pending", "=", True)], limit=limit)
+        requests._sync_quote_lines()
+        requests.write({"quote_sync_pending": False})
+        if len(requests) == limit:
+            self.env.ref("so_purchase_request_matrix.ir_cron_prq_sync_pending_quotes")._trigger()
         return True
 
+    @api.model
+    def _cron_archive_completed_requests(self, limit=ARCHIVE_BATCH_SIZE):
+        """Archive the data of requests completed or cancelled for a while, ``limit`` requests per run.
+
+        The age is set in days with the ``so_purchase_request_matrix.archive_after_days``
+        parameter (0 disables archiving); the cron triggers itself again until no request is left.
+        """
+        days = self.env["ir.config_parameter"].sudo().get_param("so_purchase_request_matrix.archive_after_days", ARCHIVE_AFTER_DAYS)
+        try:
+            days = int(days)
+        except ValueError:
+            return True
+        if days <= 0:
+            return True
+        requests = self.search([
+            ("state", "in", ("po_created", "cancel")),
+            ("is_archived", "=", False),
+            ("write_date", "<", fields.Datetime.subtract(fields.Datetime.now(), days=days)),
+        ], limit=limit, order="id")
+        requests._archive_superseded_data()
+        if len(requests) == limit:
+            self.env.ref("so_purchase_request_matrix.ir_cron_prq_archive_completed_requests")._trigger()
+        return True
+
+    def _archive_superseded_data(self):
+        """Archive the superseded RFQs of the requests in ``self`` and compact their quote lines.
+
+        The vendor summaries are refreshed one last time and then keep the quoted coverage and
+        RFQ amounts in place of the quote lines, which are deleted. Draft, sent and cancelled
+        RFQs are archived; their lines keep feeding the vendor price history.
+        """
+        if not self:
+            return
+        self.env["so.purchase.request.vendor.summary"].sudo()._refresh(dict.fromkeys(self.ids))
+        self.not_final_po_ids.filtered(lambda po: po.state in ("draft", "sent", "cancel")).write({"active": False})
+        self.quote_line_ids.unlink()
+        self.write({"is_archived": True})
+
+    @prq_instrument("action_submit_for_approval")
     def action_submit_for_approval(self):
         for request in self:
             if not request.quote_line_ids:
                 raise UserError(_("Please sync quotations from RFQs before submitting for approval."))
-            request.state = "waiting_approval"
-            # Schedule a basic activity for Purchase Manager group users on the document
-            manager_group = self.env.ref("purchase.group_purchase_manager", raise_if_not_found=False)
-            if manager_group:
-                manager_users = manager_group.users
-                for user in manager_users:
-                    self.activity_schedule(
-                        "mail.mail_activity_data_todo", user_id=user.id,
-                        note=_("Purchase Request %s waiting for approval.") % request.name,
-                    )
+        self.write({"state": "waiting_approval"})
+        self._schedule_approval_activities()
         return True
 
+    def _schedule_approval_activities(self):
+        """Schedule an approval to-do for every Purchase Manager on every request in ``self``.
+
+        The activities of all (request, manager) pairs are created in a single call, skipping
+        the pairs that already have an open one. With the ``so_purchase_request_matrix.approval_digest``
+        parameter set, the activities are created silently and each manager gets one digest email
+        listing the requests instead of one notification per activity.
+        """
+        manager_group = self.env.ref("purchase.group_purchase_manager", raise_if_not_found=False)
+        activity_type = self.env.ref("mail.mail_activity_data_todo", raise_if_not_found=False)
+        if not self or not manager_group or not activity_type:
+            return
+        managers = manager_group.users
+        Activity = self.env["mail.activity"]
+        existing = {
+            (activity["res_id"], activity["user_id"][0])
+            for activity in Activity.search_read([
+                ("res_model", "=", self._name),
+                ("res_id", "in", self.ids),
+                ("activity_type_id", "=", activity_type.id),
+                ("user_id", "in", managers.ids),
+            ], ["res_id", "user_id"])
+        }
+        model_id = self.env["ir.model"]._get_id(self._name)
+        date_deadline = activity_type._get_date_deadline()
+        vals_list = [{
+            "res_model_id": model_id,
+            "res_id": request.id,
+            "activity_type_id": activity_type.id,
+            "summary": activity_type.summary,
+            "note": _("Purchase Request %s waiting for approval.", request.name),
+            "user_id": user.id,
+            "date_deadline": date_deadline,
+        } for request in self for user in managers if (request.id, user.id) not in existing]
+        if not vals_list:
+            return
+        digest = self.env["ir.config_parameter"].sudo().get_param("so_purchase_request_matrix.approval_digest")
+        if not digest:
+            Activity.create(vals_list)
+            return
+        Activity.with_context(mail_activity_quick_update=True).create(vals_list)
+        requests_by_user = {}
+        for vals in vals_list:
+            requests_by_user.setdefault(vals["user_id"], []).append(vals["res_id"])
+        self.env["mail.mail"].sudo().create([
+            self.browse(request_ids)._prepare_approval_digest_vals(self.env["res.users"].browse(user_id))
+            for user_id, request_ids in requests_by_user.items()
+        ])
+
+    def _prepare_approval_digest_vals(self, user):
+        """Values of the digest email telling ``user`` that the requests in ``self`` wait for approval."""
+        items = Markup().join(
+            Markup("<li>%s</li>") % (f"{request.name} ({request.sale_order_id.name})" if request.sale_order_id else request.name)
+            for request in self
+        )
+        return {
+            "subject": _("%s Purchase Request(s) waiting for approval", len(self)),
+            "body_html": Markup("<p>%s</p><ul>%s</ul>") % (_("The following Purchase Requests wait for your approval:"), items),
+            "recipient_ids": [(4, user.partner_id.id)],
+            "email_from": self.env.company.email_formatted or self.env.user.email_formatted,
+            "auto_delete": True,
+        }
+
+    def _check_allocation_totals(self, totals, product_ids=None):
+        """Raise if the allocated quantities ``totals`` ({product_id: qty}) differ from the requested ones.
+
+        :param product_ids: optional set of products restricting the check to their lines
+        """
+        self.ensure_one()
+        for line in self.line_ids:
+            if product_ids is not None and line.product_id.id not in product_ids:
+                continue
+            total = totals.get(line.product_id.id, 0.0)
+            if abs(total - line.qty_request) > 1e-6:
+                raise ValidationError(_(
+                    "Allocation error for product '%s': allocated quantity %.2f must equal requested quantity %.2f."
+                ) % (line.product_id.display_name, total, line.qty_request))
+
     def _validate_allocations(self):
         for request in self:
             # sums per product must equal requested qty
@@ -159,14 +622,10 @@ class PurchaseRequest(models.Model):
             for alloc in request.allocation_ids:
                 by_product.setdefault(alloc.product_id.id, 0.0)
                 by_product[alloc.product_id.id] += alloc.qty_alloc
-            for line in request.line_ids:
-                total = by_product.get(line.product_id.id, 0.0)
-                if abs(total - line.qty_request) > 1e-6:
-                    raise ValidationError(_(
-                        "Allocation error for product '%s': allocated quantity %.2f must equal requested quantity %.2f."
-                    ) % (line.product_id.display_name, total, line.qty_request))
+            request._check_allocation_totals(by_product)
         return True
 
+    @prq_instrument("action_approve")
     def action_approve(self):
         self._validate_allocations()
         self.write({"state": "approved"})
@@ -184,170 +643,1004 @@ class PurchaseRequest(models.Model):
             "so_from_request": True,
         }
 
-    def _convert_price_to_currency(self, price, from_currency, to_currency, date):
-        return from_currency._convert(price, to_currency, self.company_id, date or fields.Date.context_today(self))
+    def _convert_price_to_currency(self, price, from_currency, to_currency, date, cache=None):
+        date = date or fields.Date.context_today(self)
+        if cache is not None:
+            return cache.convert(price, from_currency, to_currency, self.company_id, date)
+        return from_currency._convert(price, to_currency, self.company_id, date)
 
-    def action_create_pos(self):
-        PurchaseOrder = self.env["purchase.order"]
-        PurchaseOrderLine = self.env["purchase.order.line"]
+    def _prepare_po_line_from_alloc(self, alloc, quote_line, fiscal_position, currency, date_order, cache, mapped_taxes):
+        """Values of the final PO line of ``alloc``.
+
+        :param quote_line: quote line of the allocation's (vendor, product), if any
+        :param mapped_taxes: dict memoizing the fiscal position mapping by tax ids
+        """
+        self.ensure_one()
+        product = alloc.product_id
+        po_uom = product.uom_po_id
+        qty_po = cache.quantity(alloc.qty_alloc, alloc.product_uom_id, po_uom)
+        # Determine base price: explicit override or best available normalized quote
+        alloc_price = alloc.price_unit_alloc or 0.0
+        if not alloc_price:
+            ql = alloc.quote_line_id or quote_line
+            if ql:
+                alloc_price = ql.normalized_price_unit
+        # price conversion: allocation currency -> PO currency
+        price_in_po_currency = self._convert_price_to_currency(alloc_price, alloc.currency_id, currency, date_order, cache=cache)
+        taxes = alloc.taxes_id or (quote_line and quote_line.taxes_id) or product.supplier_taxes_id
+        if fiscal_position:
+            key = tuple(taxes.ids)
+            if key not in mapped_taxes:
+                mapped_taxes[key] = fiscal_position.map_tax(taxes)
+            taxes = mapped_taxes[key]
+        return {
+            "product_id": product.id,
+            "name": product.display_name,
+            "product_uom": po_uom.id,
+            "product_qty": qty_po,
+            "price_unit": price_in_po_currency,
+            "date_planned": fields.Date.context_today(self),
+            "taxes_id": [(6, 0, taxes.ids)],
+        }
+
+    def _get_sale_line_demand(self, cache):
+        """Remaining demand of each sale line, for splitting final PO lines back per Sales Order.
+
+        :return: dict {product_id: list of [sale line, qty in request line UoM]}
+        """
+        self.ensure_one()
+        served = {}
+        for po_line in self.final_po_ids.order_line:
+            if po_line.so_sale_line_id:
+                served.setdefault(po_line.so_sale_line_id.id, []).append(po_line)
+        demand = {}
+        for line in self.line_ids:
+            for sale_line in line.sale_line_ids:
+                qty = cache.quantity(sale_line.product_uom_qty, sale_line.product_uom, line.product_uom_id)
+                for po_line in served.get(sale_line.id, ()):
+                    qty -= cache.quantity(po_line.product_qty, po_line.product_uom, line.product_uom_id)
+                if qty > 1e-6:
+                    demand.setdefault(line.product_id.id, []).append([sale_line, qty])
+        return demand
+
+    def _split_po_line_vals_by_sale_line(self, vals, alloc, sale_demand, cache):
+        """Split the PO line values of ``alloc`` into one line per sale line it serves.
+
+        Sale lines are served in order and ``sale_demand`` is consumed accordingly, so that
+        allocations of the same product to several vendors share the demand out.
+        """
+        self.ensure_one()
+        queue = sale_demand.get(alloc.product_id.id, [])
+        po_uom = self.env["uom.uom"].browse(vals["product_uom"])
+        remaining = alloc.qty_alloc
+        split = []
+        while queue and remaining > 1e-6:
+            entry = queue[0]
+            sale_line, qty = entry[0], min(entry[1], remaining)
+            entry[1] -= qty
+            remaining -= qty
+            if entry[1] <= 1e-6:
+                queue.pop(0)
+            split.append(dict(
+                vals,
+                name="%s - %s" % (vals["name"], sale_line.order_id.name),
+                product_qty=cache.quantity(qty, alloc.product_uom_id, po_uom),
+                so_sale_line_id=sale_line.id,
+            ))
+        if remaining > 1e-6:
+            split.append(dict(vals, product_qty=cache.quantity(remaining, alloc.product_uom_id, po_uom)))
+        return split
+
+    def _create_final_pos(self, vendors=None):
+        """Create the final POs of the requests in ``self``, one per allocated vendor.
+
+        Quote lines are indexed by (vendor, product) once per request, and all orders
+        are created together with their lines in a single ``create`` call.
+
+        :param vendors: restrict the POs to these allocated vendors
+        """
+        FiscalPosition = self.env["account.fiscal.position"]
+        Currency = self.env["res.currency"]
+        cache = NormalizationCache(self.env)
+        date_order = fields.Datetime.now()
+        order_vals_list = []
         for request in self:
-            if request.state not in ("approved", "waiting_approval"):
-                raise UserError(_("Allocations must be approved first."))
-            request._validate_allocations()
+            quotes = {(ql.vendor_id.id, ql.product_id.id): ql for ql in request.quote_line_ids}
+            sale_demand = request._get_sale_line_demand(cache) if request.is_consolidated else {}
             # group allocations by vendor
             allocs_by_vendor = {}
             for alloc in request.allocation_ids:
-                allocs_by_vendor.setdefault(alloc.vendor_id, self.env["so.purchase.request.allocation"])
-                allocs_by_vendor[alloc.vendor_id] |= alloc
+                if vendors is None or alloc.vendor_id in vendors:
+                    allocs_by_vendor.setdefault(alloc.vendor_id, []).append(alloc)
             for vendor, allocs in allocs_by_vendor.items():
                 po_vals = request._prepare_po_from_alloc_vendor(vendor)
-                po_vals["is_final_po"] = True
-                po = PurchaseOrder.create(po_vals)
-                fpos = po.fiscal_position_id
+                fiscal_position = FiscalPosition.with_company(request.company_id)._get_fiscal_position(vendor)
+                currency = Currency.browse(po_vals["currency_id"])
+                mapped_taxes = {}
+                lines_vals = []
                 for alloc in allocs:
-                    po_uom = alloc.product_id.uom_po_id
-                    qty_po = alloc.product_uom_id._compute_quantity(alloc.qty_alloc, po_uom, rounding_method="HALF-UP")
-                    # price conversion: allocation currency -> PO currency
-                    # Determine base price: explicit override or best available normalized quote
-                    alloc_price = alloc.price_unit_alloc or 0.0
-                    if not alloc_price:
-                        ql = alloc.quote_line_id or self.env["so.purchase.request.quote.line"].search([
-                            ("request_id", "=", request.id),
-                            ("vendor_id", "=", alloc.vendor_id.id),
-                            ("product_id", "=", alloc.product_id.id),
-                        ], limit=1)
-                        if ql:
-                            alloc_price = ql.normalized_price_unit
-                    price_in_po_currency = self._convert_price_to_currency(
-                        alloc_price, alloc.currency_id, po.currency_id, po.date_order
+                    line_vals = request._prepare_po_line_from_alloc(
+                        alloc, quotes.get((vendor.id, alloc.product_id.id)),
+                        fiscal_position, currency, date_order, cache, mapped_taxes,
                     )
-                    taxes = alloc.taxes_id
-                    if not taxes:
-                        ql_taxes = self.env["so.purchase.request.quote.line"].search([
-                            ("request_id", "=", request.id),
-                            ("vendor_id", "=", alloc.vendor_id.id),
-                            ("product_id", "=", alloc.product_id.id),
-                        ], limit=1).taxes_id
-                        taxes = ql_taxes or alloc.product_id.supplier_taxes_id
-                    if fpos:
-                        taxes = fpos.map_tax(taxes)
-                    PurchaseOrderLine.create({
-                        "order_id": po.id,
-                        "product_id": alloc.product_id.id,
-                        "name": alloc.product_id.display_name,
-                        "product_uom": po_uom.id,
-                        "product_qty": qty_po,
-                        "price_unit": price_in_po_currency,
-                        "date_planned": fields.Date.context_today(self),
-                        "taxes_id": [(6, 0, taxes.ids)],
-                    })
-            request.state = "po_created"
+                    if request.is_consolidated:
+                        lines_vals += request._split_po_line_vals_by_sale_line(line_vals, alloc, sale_demand, cache)
+                    else:
+                        lines_vals.append(line_vals)
+                po_vals.update({
+                    "is_final_po": True,
+                    "date_order": date_order,
+                    "fiscal_position_id": fiscal_position.id,
+                    "order_line": [(0, 0, line_vals) for line_vals in lines_vals],
+                })
+                order_vals_list.append(po_vals)
+        return self.env["purchase.order"].create(order_vals_list)
+
+    @prq_instrument("action_create_pos")
+    def action_create_pos(self):
+        for request in self:
+            if request.state not in ("approved", "waiting_approval"):
+                raise UserError(_("Allocations must be approved first."))
+        self._validate_allocations()
+        background = self.filtered("run_in_background")
+        background._enqueue_jobs("create_pos")
+        foreground = self - background
+        if foreground:
+            # the vendors of a consolidated request share out the demand of the same sale lines,
+            # which parallel workers cannot see each other consume
+            parallel = foreground.filtered(lambda r: not r.is_consolidated)
+            vendors_by_request = {request: request.allocation_ids.vendor_id for request in parallel}
+            if not parallel._generate_per_vendor_in_parallel("_create_missing_final_pos", vendors_by_request):
+                parallel._create_final_pos()
+            (foreground - parallel)._create_final_pos()
+            foreground.write({"state": "po_created"})
         return True
 
-    def _bus_send_matrix_update(self):
-        self.env["bus.bus"]._sendone(f"so_prq_matrix", "matrix_update", {
-            "type": "matrix_update",
+    def _create_missing_final_pos(self, vendors):
+        """Create the final POs of the ``vendors`` that have none yet, safe to run again after a partial run."""
+        self.ensure_one()
+        vendors -= self.final_po_ids.partner_id
+        if not vendors:
+            return self.env["purchase.order"]
+        return self._create_final_pos(vendors=vendors)
+
+    def _schedule_price_history_rebuild(self):
+        """Rebuild the price history of the requests' vendors and products after the commit.
+
+        The rebuild runs in a new cursor once the current transaction is committed: the final
+        POs created by parallel workers were committed after the snapshot of the current
+        transaction was taken, and it cannot see them.
+        """
+        data = self.env.cr.postcommit.data
+        keys = data.get("so_prq.price_history_keys")
+        if keys is None:
+            keys = data["so_prq.price_history_keys"] = (set(), set())
+            registry = self.env.registry
+
+            @self.env.cr.postcommit.add
+            def rebuild():
+                vendor_ids, product_ids = data.pop("so_prq.price_history_keys")
+                with registry.cursor() as cr:
+                    env = api.Environment(cr, SUPERUSER_ID, {})
+                    env["so.purchase.request.price.history"]._rebuild(vendor_ids=vendor_ids, product_ids=product_ids)
+
+        # every quoting vendor feeds the history, not only the awarded ones
+        keys[0].update((self.quote_line_ids.vendor_id | self.allocation_ids.vendor_id).ids)
+        keys[1].update(self.line_ids.product_id.ids)
+
+    # ---------- Parallel generation ----------
+    @api.model
+    def _get_parallel_workers(self):
+        """Number of threads generating orders in parallel, 0 when disabled.
+
+        Set with the ``so_purchase_request_matrix.parallel_workers`` parameter and bounded
+        by the database connection pool; always disabled in tests.
+        """
+        if getattr(threading.current_thread(), "testing", False):
+            return 0
+        workers = self.env["ir.config_parameter"].sudo().get_param("so_purchase_request_matrix.parallel_workers", 0)
+        try:
+            workers = int(workers)
+        except ValueError:
+            return 0
+        return max(0, min(workers, config["db_maxconn"] // 2))
+
+    def _generate_per_vendor_in_parallel(self, method_name, vendors_by_request):
+        """Call ``request.method_name(vendor)`` for every vendor of every request, in parallel.
+
+        The calls run in threads of the current process: they overlap their database round
+        trips, while their Python work (ORM, taxes, prices) is still serialized by the GIL.
+        Each call has its own cursor and commits on its own, with the
+        matrix notifications deferred to the current transaction so that the workers never
+        update the request rows. The calls that failed are rolled back and run again in
+        the current transaction, which then updates the requests as usual.
+
+        The generation is not atomic: the current transaction cannot read the orders the
+        workers committed, and they are kept if it fails afterwards. Running the action again
+        only generates the missing vendors' orders, as the generation methods are idempotent.
+
+        :param method_name: idempotent per-vendor generation method, e.g. ``_create_missing_rfqs``
+        :param vendors_by_request: dict {request: vendors}
+        :return: whether the generation ran, ``False`` when parallel mode is disabled or not worth it
+        """
+        tasks = [(request.id, vendor_id) for request, vendors in vendors_by_request.items() for vendor_id in vendors.ids]
+        workers = min(self._get_parallel_workers(), len(tasks))
+        if workers < 2:
+            return False
+        registry = self.env.registry
+        uid = self.env.uid
+        context = dict(self.env.context, prq_defer_matrix_notify=True)
+        dbname = self.env.cr.dbname
+
+        def generate(task):
+            request_id, vendor_id = task
+            threading.current_thread().dbname = dbname
+            with registry.cursor() as cr:
+                env = api.Environment(cr, uid, context)
+                request = env[self._name].browse(request_id)
+                getattr(request, method_name)(env["res.partner"].browse(vendor_id))
+
+        failed = []
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prq_generate") as executor:
+            for task, future in [(task, executor.submit(generate, task)) for task in tasks]:
+                try:
+                    future.result()
+                except Exception:
+                    _logger.warning("Parallel %s failed for request %s, vendor %s", method_name, *task, exc_info=True)
+                    failed.append(task)
+        Partner = self.env["res.partner"]
+        for request_id, vendor_id in failed:
+            getattr(self.browse(request_id), method_name)(Partner.browse(vendor_id))
+        self._mark_matrix_dirty()
+        return True
+
+    # ---------- Background jobs ----------
+    def _get_job_vendors(self, job_type):
+        """Vendors whose work makes up the chunks of a ``job_type`` background operation."""
+        self.ensure_one()
+        if job_type == "create_rfqs":
+            return self.vendor_ids
+        if job_type == "sync_quotes":
+            return self.rfq_ids.partner_id
+        return self.allocation_ids.vendor_id
+
+    def _enqueue_jobs(self, job_type):
+        """Split a ``job_type`` operation on the requests in ``self`` into one job per vendor.
+
+        The jobs of previous operations are dropped so that the progress reflects the
+        current one; the request state is updated once its last job is done.
+        """
+        if not self:
+            return
+        requests = self.sudo()
+        if any(requests.mapped("job_running")):
+            raise UserError(_("Background jobs are still running for this purchase request."))
+        requests.job_ids.unlink()
+        self.env["so.purchase.request.job"].sudo().create([{
+            "request_id": request.id,
+            "job_type": job_type,
+            "vendor_ids": [(6, 0, vendor.ids)],
+        } for request in self for vendor in request._get_job_vendors(job_type)])
+        self.env.ref("so_purchase_request_matrix.ir_cron_prq_process_jobs").sudo()._trigger()
+        for request in requests.filtered(lambda r: not r.job_ids):
+            request._finalize_jobs(job_type)
+        self._mark_matrix_dirty()
+
+    def _finalize_jobs(self, job_type):
+        """Move the request forward once all its ``job_type`` jobs ran, report failures."""
+        self.ensure_one()
+        self._mark_matrix_dirty()
+        jobs = self.sudo().job_ids.filtered(lambda j: j.job_type == job_type)
+        if any(job.state == "pending" for job in jobs):
+            return
+        failed = jobs.filtered(lambda j: j.state == "failed")
+        if failed:
+            self.message_post(body=_(
+                "%(count)s background job(s) failed for vendors %(vendors)s: %(error)s",
+                count=len(failed),
+                vendors=", ".join(failed.vendor_ids.mapped("display_name")),
+                error=failed[0].error,
+            ))
+        elif job_type == "create_rfqs" and self.state == "vendors_selected":
+            self.state = "rfqs_created"
+        elif job_type == "create_pos" and self.state in ("approved", "waiting_approval"):
+            self.state = "po_created"
+
+    # ---------- Matrix notifications ----------
+    def _get_matrix_channel(self):
+        """Bus channel of the matrix: the request itself, so that only its readers get the updates.
+
+        The widget subscribes to ``so_prq_matrix_<id>``, which ``ir.websocket`` maps to the
+        request after checking the user can read it.
+        """
+        self.ensure_one()
+        return self
+
+    def _mark_matrix_dirty(self, cells=None):
+        """Schedule a matrix notification for the requests in ``self``.
+
+        Notifications are coalesced and sent once per request right before the
+        transaction commits, together with a bump of ``matrix_version``.
+
+        :param cells: iterable of changed (request_id, product_id, vendor_id); when not
+                      given, viewers of the requests in ``self`` reload the whole matrix
+        """
+        if not self or self.env.context.get("prq_defer_matrix_notify"):
+            return
+        data = self.env.cr.precommit.data
+        dirty = data.get("so_prq.matrix_dirty")
+        if dirty is None:
+            dirty = data["so_prq.matrix_dirty"] = {}
+            self.env.cr.precommit.add(self.sudo().browse()._send_matrix_notifications)
+        if cells is None:
+            for request_id in self.ids:
+                dirty[request_id] = None
+            return
+        for request_id, product_id, vendor_id in cells:
+            request_cells = dirty.setdefault(request_id, set())
+            if request_cells is not None:
+                request_cells.add((product_id, vendor_id))
+
+    @api.model
+    def _get_price_outlier_threshold(self):
+        """Relative deviation from the historical median above which a quote is flagged."""
+        threshold = self.env["ir.config_parameter"].sudo().get_param("so_purchase_request_matrix.price_outlier_threshold", 0.3)
+        try:
+            return float(threshold)
+        except ValueError:
+            return 0.3
+
+    def _get_matrix_cell_values(self, cells_by_request):
+        """Current quote and allocation values of the given cells.
+
+        :param cells_by_request: dict {request_id: set of (product_id, vendor_id)}
+        :return: dict {request_id: list of cell dicts}
+        """
+        product_ids = list({product_id for cells in cells_by_request.values() for product_id, _vendor_id in cells})
+        domain = [("request_id", "in", list(cells_by_request)), ("product_id", "in", product_ids)]
+        quotes = {
+            (quote["request_id"][0], quote["product_id"][0], quote["vendor_id"][0]): quote
+            for quote in self.env["so.purchase.request.quote.line"].search_read(
+                domain, ["request_id", "product_id", "vendor_id", "product_uom_id", "price_unit_quote", "currency_id", "normalized_price_unit"],
+            )
+        }
+        medians = self.env["so.purchase.request.price.history"].sudo()._get_medians(
+            list({vendor_id for cells in cells_by_request.values() for _product_id, vendor_id in cells}), product_ids,
+        )
+        threshold = self._get_price_outlier_threshold()
+        allocations = {
+            (alloc["request_id"][0], alloc["product_id"][0], alloc["vendor_id"][0]): alloc
+            for alloc in self.env["so.purchase.request.allocation"].search_read(
+                domain, ["request_id", "product_id", "vendor_id", "qty_alloc", "price_unit_alloc"],
+            )
+        }
+        values = {}
+        for request_id, cells in cells_by_request.items():
+            request_values = values[request_id] = []
+            for product_id, vendor_id in cells:
+                quote = quotes.get((request_id, product_id, vendor_id))
+                alloc = allocations.get((request_id, product_id, vendor_id))
+                median = quote and medians.get((vendor_id, product_id, quote["product_uom_id"][0], quote["currency_id"][0]))
+                request_values.append({
+                    "product_id": product_id,
+                    "vendor_id": vendor_id,
+                    "quote": quote and {
+                        "price_unit": quote["price_unit_quote"],
+                        "currency": quote["currency_id"][1],
+                        "normalized_price_unit": quote["normalized_price_unit"],
+                        "hist_median": median,
+                        "outlier": _is_price_outlier(quote["price_unit_quote"], median, threshold),
+                    },
+                    "allocation": alloc and {
+                        "qty": alloc["qty_alloc"],
+                        "price": alloc["price_unit_alloc"] or 0.0,
+                    },
+                })
+        return values
+
+    def _send_matrix_notifications(self):
+        dirty = self.env.cr.precommit.data.pop("so_prq.matrix_dirty", {})
+        requests = self.browse(list(dirty)).exists()
+        if not requests:
+            return
+        self.env.flush_all()
+        self.env.cr.execute(
+            "UPDATE so_purchase_request SET matrix_version = matrix_version + 1 WHERE id IN %s RETURNING id, matrix_version",
+            [tuple(requests.ids)],
+        )
+        versions = dict(self.env.cr.fetchall())
+        requests.invalidate_recordset(["matrix_version"])
+        cell_values = self._get_matrix_cell_values({
+            request_id: cells for request_id, cells in dirty.items() if cells and request_id in versions
         })
+        for request in requests:
+            self.env["bus.bus"]._sendone(request._get_matrix_channel(), "prq_matrix_update", {
+                "request_id": request.id,
+                "version": versions[request.id],
+                "full": dirty[request.id] is None,
+                "cells": cell_values.get(request.id, []),
+            })
+        self.env.flush_all()
+
+    def _get_matrix_vendor_header(self):
+        """Earliest planned date and payment term of each vendor's RFQs, from the vendor summaries.
+
+        :return: dict {vendor_id: (date_planned, payment_term_name)}
+        """
+        self.ensure_one()
+        pending = self.env.cr.precommit.data.get("so_prq.dirty_vendor_summaries", {})
+        Summary = self.env["so.purchase.request.vendor.summary"]
+        domain = [("request_id", "=", self.id)]
+        if self.id in pending:
+            self._flush_vendor_summaries()
+        summaries = Summary.search_read(domain, ["vendor_id", "date_planned", "payment_term_id"])
+        if not summaries and self.vendor_ids:
+            # requests created before the summaries existed
+            Summary.sudo()._refresh({self.id: None})
+            summaries = Summary.search_read(domain, ["vendor_id", "date_planned", "payment_term_id"])
+        return {
+            summary["vendor_id"][0]: (
+                fields.Date.to_string(summary["date_planned"]) if summary["date_planned"] else False,
+                summary["payment_term_id"][1] if summary["payment_term_id"] else False,
+            )
+            for summary in summaries
+        }
+
+    def _mark_vendor_summary_dirty(self, pairs=None):
+        """Schedule a refresh of the vendor summaries right before the transaction commits.
+
+        :param pairs: iterable of changed (request_id, vendor_id); when not given, the
+                      summaries of all the vendors of the requests in ``self`` are refreshed
+        """
+        if not self:
+            return
+        data = self.env.cr.precommit.data
+        dirty = data.get("so_prq.dirty_vendor_summaries")
+        if dirty is None:
+            dirty = data["so_prq.dirty_vendor_summaries"] = {}
+            self.env.cr.precommit.add(self.sudo().browse()._flush_vendor_summaries)
+        if pairs is None:
+            for request_id in self.ids:
+                dirty[request_id] = None
+            return
+        for request_id, vendor_id in pairs:
+            vendor_ids = dirty.setdefault(request_id, set())
+            if vendor_ids is not None:
+                vendor_ids.add(vendor_id)
+
+    def _flush_vendor_summaries(self):
+        dirty = self.env.cr.precommit.data.pop("so_prq.dirty_vendor_summaries", {})
+        if dirty:
+            self.env["so.purchase.request.vendor.summary"].sudo()._refresh(dirty)
+            self.env.flush_all()
+
+    def _get_matrix_line_domain(self, search=None, only_unallocated=False):
+        self.ensure_one()
+        domain = [("request_id", "=", self.id)]
+        if search:
+            domain.append(("product_id", "ilike", search))
+        if only_unallocated:
+            allocated = self.env["so.purchase.request.allocation"]._read_group(
+                [("request_id", "=", self.id)], ["product_id"],
+            )
+            domain.append(("product_id", "not in", [product.id for product, in allocated]))
+        return domain
+
+    def _get_matrix_grid(self, offset=0, limit=None, vendor_ids=None, search=None, only_unallocated=False):
+        """Columnar comparison matrix of the request.
+
+        Vendors and request lines are returned as parallel arrays, and the quote and
+        allocation values as row-major grids (one row per request line, one column per
+        vendor, ``None`` for empty cells). Quote lines and allocations are bucketed by
+        product in a single pass.
+
+        :param offset: index of the first request line of the window
+        :param limit: maximum number of request lines of the window (all if not set)
+        :param vendor_ids: restrict the columns to these vendors
+        :param search: only keep the lines whose product matches this string
+        :param only_unallocated: only keep the lines whose product has no allocation yet
+        """
+        self.ensure_one()
+        no_info = _("No information available")
+        vendors = self.vendor_ids
+        if vendor_ids is not None:
+            vendors = vendors.filtered(lambda v: v.id in vendor_ids)
+        header = self._get_matrix_vendor_header()
+        vendor_col = {vendor_id: col for col, vendor_id in enumerate(vendors.ids)}
+        RequestLine = self.env["so.purchase.request.line"]
+        line_domain = self._get_matrix_line_domain(search=search, only_unallocated=only_unallocated)
+        lines = RequestLine.search_read(
+            line_domain, ["product_id", "qty_request", "product_uom_id"], offset=offset, limit=limit, order="id",
+        )
+        if offset or (limit and len(lines) == limit):
+            total = RequestLine.search_count(line_domain)
+        else:
+            total = len(lines)
+        window_domain = [
+            ("request_id", "=", self.id),
+            ("vendor_id", "in", vendors.ids),
+            ("product_id", "in", list({line["product_id"][0] for line in lines})),
+        ]
+        product_rows = {}
+        for row, line in enumerate(lines):
+            product_rows.setdefault(line["product_id"][0], []).append(row)
+
+        def empty_grid():
+            return [[None] * len(vendors) for _line in lines]
+
+        price, currency, normalized_price = empty_grid(), empty_grid(), empty_grid()
+        alloc_qty, alloc_price = empty_grid(), empty_grid()
+        currencies = []
+        currency_idx = {}
+        quotes = self.env["so.purchase.request.quote.line"].search_read(
+            window_domain,
+            ["vendor_id", "product_id", "product_uom_id", "price_unit_quote", "currency_id", "normalized_price_unit"],
+        )
+        hist_median, outlier = empty_grid(), empty_grid()
+        medians = self.env["so.purchase.request.price.history"].sudo()._get_medians(vendors.ids, list(product_rows))
+        threshold = self._get_price_outlier_threshold()
+        for quote in quotes:
+            col = vendor_col.get(quote["vendor_id"][0])
+            if col is None:
+                continue
+            currency_id, currency_name = quote["currency_id"]
+            if currency_id not in currency_idx:
+                currency_idx[currency_id] = len(currencies)
+                currencies.append(currency_name)
+            median = medians.get((quote["vendor_id"][0], quote["product_id"][0], quote["product_uom_id"][0], currency_id))
+            for row in product_rows.get(quote["product_id"][0], ()):
+                price[row][col] = quote["price_unit_quote"]
+                currency[row][col] = currency_idx[currency_id]
+                normalized_price[row][col] = quote["normalized_price_unit"]
+                hist_median[row][col] = median
+                outlier[row][col] = _is_price_outlier(quote["price_unit_quote"], median, threshold)
+        allocations = self.env["so.purchase.request.allocation"].search_read(
+            window_domain, ["vendor_id", "product_id", "qty_alloc", "price_unit_alloc"],
+        )
+        for alloc in allocations:
+            col = vendor_col.get(alloc["vendor_id"][0])
+            if col is None:
+                continue
+            for row in product_rows.get(alloc["product_id"][0], ()):
+                alloc_qty[row][col] = alloc["qty_alloc"]
+                alloc_price[row][col] = alloc["price_unit_alloc"] or 0.0
+        return {
+            "id": self.id,
+            "name": self.name,
+            "approval_split_by_vendor": self.approval_split_by_vendor,
+            "company_currency": self.currency_id.display_name,
+            "job_running": self.job_running,
+            "job_progress": self.job_progress,
+            "version": self.matrix_version,
+            "total_lines": total,
+            "offset": offset,
+            "vendors": {
+                "ids": vendors.ids,
+                "names": [vendor.display_name for vendor in vendors],
+                "date_planned": [header.get(vendor_id, (False, False))[0] or no_info for vendor_id in vendors.ids],
+                "payment_term": [header.get(vendor_id, (False, False))[1] or no_info for vendor_id in vendors.ids],
+            },
+            "lines": {
+                "ids": [line["id"] for line in lines],
+                "product_ids": [line["product_id"][0] for line in lines],
+                "product_names": [line["product_id"][1] for line in lines],
+                "qty_request": [line["qty_request"] for line in lines],
+                "uom_names": [line["product_uom_id"][1] for line in lines],
+            },
+            "currencies": currencies,
+            "price": price,
+            "currency": currency,
+            "normalized_price": normalized_price,
+            "hist_median": hist_median,
+            "outlier": outlier,
+            "alloc_qty": alloc_qty,
+            "alloc_price": alloc_price,
+        }
+
+    @api.model
+    @prq_instrument("prq_get_matrix_grid")
+    def prq_get_matrix_grid(self, request_id, offset=0, limit=None, vendor_ids=None, search=None,
+                            only_unallocated=False, known_version=None):
+        """Columnar matrix payload consumed by the ``prq_matrix`` widget, see ``_get_matrix_grid``.
+
+        Payloads are cached per (request, ``matrix_version``, language, company, window).
+        A client passing the ``known_version`` it already holds gets a ``not_modified``
+        answer instead of the payload when the matrix did not change since.
+        """
+        request = self.browse(request_id)
+        request.check_access_rights("read")
+        request.check_access_rule("read")
+        version = request.matrix_version
+        if known_version is not None and known_version == version:
+            return {"id": request.id, "version": version, "not_modified": True}
+        window = {
+            "offset": offset,
+            "limit": limit,
+            "vendor_ids": vendor_ids,
+            "search": search,
+            "only_unallocated": only_unallocated,
+        }
+        # changes of the current transaction are not reflected by matrix_version yet
+        if request.id in self.env.cr.precommit.data.get("so_prq.matrix_dirty", {}):
+            return request._get_matrix_grid(**window)
+        key = (
+            self.env.cr.dbname, request.id, version, self.env.lang, self.env.company.id,
+            offset, limit, tuple(vendor_ids) if vendor_ids is not None else None, search or None, bool(only_unallocated),
+        )
+        grid = _matrix_snapshots.get(key)
+        if grid is None:
+            grid = _matrix_snapshots[key] = request._get_matrix_grid(**window)
+        return grid
 
     @api.model
+    @prq_instrument("prq_get_matrix_data")
     def prq_get_matrix_data(self, request_id):
+        """Matrix payload with one nested dict per line, built from the columnar grid."""
         request = self.browse(request_id)
         request.check_access_rights("read")
         request.check_access_rule("read")
-        vendors = []
-        for v in request.vendor_ids:
-            rfqs_vendor = request.rfq_ids.filtered(lambda po: po.partner_id.id == v.id)
-            planned_dates = rfqs_vendor.mapped("order_line.date_planned")
-            date_planned = False
-            if planned_dates:
-                min_dt = min(planned_dates)
-                try:
-                    date_planned = fields.Datetime.to_string(min_dt)
-                except Exception:
-                    try:
-                        date_planned = fields.Date.to_string(min_dt)
-                    except Exception:
-                        date_planned = str(min_dt)
-            payment_term = False
-            if rfqs_vendor:
-                for po in rfqs_vendor:
-                    if po.payment_term_id:
-                        payment_term = po.payment_term_id.name
-                        break
-            date_planned = date_planned.split(" ")[0] if date_planned else _("No information available")
-            vendors.append({
-                "id": v.id,
-                "name": v.display_name,
-                "date_planned": date_planned,
-                "payment_term": payment_term or _("No information available"),
-            })
+        # not through prq_get_matrix_grid, which would log the call a second time
+        grid = request._get_matrix_grid()
+        vendor_ids = grid["vendors"]["ids"]
         lines = []
-        for rl in request.line_ids:
-            row = {
-                "product_id": rl.product_id.id,
-                "product_name": rl.product_id.display_name,
-                "qty_request": rl.qty_request,
-                "uom_name": rl.product_uom_id.name,
-                "quotes": {},
-            }
-            for q in request.quote_line_ids.filtered(lambda q: q.product_id.id == rl.product_id.id):
-                row["quotes"][str(q.vendor_id.id)] = {
-                    "price_unit": q.price_unit_quote,
-                    "currency": q.currency_id.display_name,
-                    "normalized_price_unit": q.normalized_price_unit,
-                }
-            # current allocations
-            allocs = request.allocation_ids.filtered(lambda a: a.product_id.id == rl.product_id.id)
-            row["allocations"] = [{
-                "vendor_id": a.vendor_id.id,
-                "qty_alloc": a.qty_alloc,
-                "price_unit_alloc": a.price_unit_alloc or 0.0,
-            } for a in allocs]
-            lines.append(row)
+        for row, product_id in enumerate(grid["lines"]["product_ids"]):
+            quotes = {}
+            allocations = []
+            for col, vendor_id in enumerate(vendor_ids):
+                if grid["price"][row][col] is not None:
+                    quotes[str(vendor_id)] = {
+                        "price_unit": grid["price"][row][col],
+                        "currency": grid["currencies"][grid["currency"][row][col]],
+                        "normalized_price_unit": grid["normalized_price"][row][col],
+                        "hist_median": grid["hist_median"][row][col],
+                        "outlier": grid["outlier"][row][col],
+                    }
+                if grid["alloc_qty"][row][col] is not None:
+                    allocations.append({
+                        "vendor_id": vendor_id,
+                        "qty_alloc": grid["alloc_qty"][row][col],
+                        "price_unit_alloc": grid["alloc_price"][row][col],
+                    })
+            lines.append({
+                "product_id": product_id,
+                "product_name": grid["lines"]["product_names"][row],
+                "qty_request": grid["lines"]["qty_request"][row],
+                "uom_name": grid["lines"]["uom_names"][row],
+                "quotes": quotes,
+                "allocations": allocations,
+            })
         return {
-            "id": request.id,
-            "name": request.name,
-            "approval_split_by_vendor": request.approval_split_by_vendor,
-            "company_currency": request.currency_id.display_name,
-            "vendors": vendors,
+            "id": grid["id"],
+            "name": grid["name"],
+            "approval_split_by_vendor": grid["approval_split_by_vendor"],
+            "company_currency": grid["company_currency"],
+            "vendors": [{
+                "id": vendor_id,
+                "name": grid["vendors"]["names"][col],
+                "date_planned": grid["vendors"]["date_planned"][col],
+                "payment_term": grid["vendors"]["payment_term"][col],
+            } for col, vendor_id in enumerate(vendor_ids)],
             "lines": lines,
         }
 
+    # ---------- Matrix export / import ----------
+    def action_export_matrix(self):
+        self.ensure_one()
+        file_format = self.env.context.get("export_format", "xlsx")
+        return {
+            "type": "ir.actions.act_url",
+            "url": f"/so_purchase_request_matrix/export/{self.id}/{file_format}",
+            "target": "download",
+        }
+
+    def action_import_quotes(self):
+        self.ensure_one()
+        return {
+            "type": "ir.actions.act_window",
+            "name": _("Import Quotes"),
+            "res_model": "so.purchase.request.quote.import.wizard",
+            "view_mode": "form",
+            "target": "new",
+            "context": {"default_request_id": self.id},
+        }
+
+    def _get_matrix_export_rows(self, batch_size=MATRIX_EXPORT_BATCH_SIZE):
+        """Yield the rows of the matrix export: a header, then one row per request line.
+
+        Vendor columns hold the quoted unit price in the vendor's currency and are titled
+        ``Vendor Name [vendor id]`` so that a returned file can be imported back. Lines are
+        read by windows of ``batch_size`` and the cache is emptied between windows, so that
+        memory does not grow with the size of the request.
+        """
+        self.ensure_one()
+        vendors = self.vendor_ids
+        yield [_("Product ID"), _("Product"), _("Quantity"), _("UoM")] + [
+            f"{vendor.display_name} [{vendor.id}]" for vendor in vendors
+        ]
+        offset = 0
+        while True:
+            grid = self._get_matrix_grid(offset=offset, limit=batch_size, vendor_ids=vendors.ids)
+            lines = grid["lines"]
+            for row, product_id in enumerate(lines["product_ids"]):
+                yield [
+                    product_id,
+                    lines["product_names"][row],
+                    lines["qty_request"][row],
+                    lines["uom_names"][row],
+                ] + ["" if price is None else price for price in grid["price"][row]]
+            offset += len(lines["ids"])
+            if len(lines["ids"]) < batch_size:
+                break
+            self.env.invalidate_all()
+
+    def _get_quote_import_currencies(self):
+        """Currency of the quotes imported for each vendor of the request, the one of its RFQ if any.
+
+        :return: dict {vendor_id: currency_id}
+        """
+        self.ensure_one()
+        rfq_currencies = {}
+        for rfq in self.not_final_po_ids:
+            rfq_currencies.setdefault(rfq.partner_id.id, rfq.currency_id.id)
+        return {
+            vendor.id: rfq_currencies.get(vendor.id) or vendor.property_purchase_currency_id.id or self.currency_id.id
+            for vendor in self.vendor_ids
+        }
+
+    def _import_quote_rows(self, rows):
+        """Import the prices of a returned matrix export, header first.
+
+        Rows are consumed lazily by chunks of ``QUOTE_IMPORT_CHUNK_SIZE``; empty price cells
+        are ignored. The prices are written on the vendors' RFQ lines and synced from there,
+        so that a later quote sync keeps them; the cells without an RFQ line only get a quote line.
+
+        :param rows: iterable of row sequences, as produced by ``_get_matrix_export_rows``
+        :return: number of imported prices
+        """
+        self.ensure_one()
+        rows = iter(rows)
+        header = next(rows, None)
+        if not header:
+            raise UserError(_("The file is empty."))
+        vendor_cols = {}
+        for col, title in enumerate(header):
+            match = re.search(r"\[(\d+)\]\s*$", str(title or ""))
+            if col >= MATRIX_EXPORT_FIXED_COLUMNS and match:
+                vendor_cols[col] = int(match.group(1))
+        currencies = self._get_quote_import_currencies()
+        if not vendor_cols:
+            raise UserError(_("No vendor column found, the file must keep the header of the matrix export."))
+        if not set(vendor_cols.values()) <= set(currencies):
+            raise UserError(_("The file contains prices of vendors that are not on this Purchase Request."))
+        request_lines = {line.product_id.id: (line.product_uom_id.id, line.qty_request) for line in self.line_ids}
+        count = 0
+        for chunk in split_every(QUOTE_IMPORT_CHUNK_SIZE, enumerate(rows, start=2), list):
+            target = {}
+            prices = {}
+            for row_number, row in chunk:
+                if not row or row[0] in (None, ""):
+                    continue
+                try:
+                    product_id = int(row[0])
+                except (TypeError, ValueError):
+                    raise UserError(_("Row %(row)s: invalid product ID %(value)s.", row=row_number, value=row[0]))
+                if product_id not in request_lines:
+                    raise UserError(_("Row %(row)s: product %(product)s is not requested.", row=row_number, product=product_id))
+                uom_id, qty = request_lines[product_id]
+                for col, vendor_id in vendor_cols.items():
+                    value = row[col] if col < len(row) else None
+                    if value in (None, ""):
+                        continue
+                    try:
+                        price = float(value)
+                    except (TypeError, ValueError):
+                        raise UserError(_("Row %(row)s: invalid price %(value)s.", row=row_number, value=value))
+                    prices[(vendor_id, product_id)] = price
+                    target[(self.id, vendor_id, product_id)] = {
+                        "request_id": self.id,
+                        "vendor_id": vendor_id,
+                        "product_id": product_id,
+                        "product_uom_id": uom_id,
+                        "qty_quote": qty,
+                        "price_unit_quote": price,
+                        "currency_id": currencies[vendor_id],
+                        # no RFQ line to sync from, see _write_imported_rfq_prices
+                        "source_rfq_id": False,
+                    }
+            count += len(target)
+            for key in self._write_imported_rfq_prices(prices):
+                del target[key]
+            self._upsert_quote_lines(target)
+        return count
+
+    def _write_imported_rfq_prices(self, prices):
+        """Write imported prices on the matching RFQ lines and sync their quote lines.
+
+        :param prices: dict {(vendor_id, product_id): price}
+        :return: set of the (request_id, vendor_id, product_id) cells that have an RFQ line
+        """
+        self.ensure_one()
+        if not prices:
+            return set()
+        order_lines = self.env["purchase.order.line"].search([
+            ("order_id.so_request_id", "=", self.id),
+            ("order_id.is_final_po", "=", False),
+            ("order_id.partner_id", "in", list({vendor_id for vendor_id, _product_id in prices})),
+            ("product_id", "in", list({product_id for _vendor_id, product_id in prices})),
+        ])
+        cells = set()
+        to_write = {}
+        for pol in order_lines:
+            price = prices.get((pol.order_id.partner_id.id, pol.product_id.id))
+            if price is None:
+                continue
+            cells.add((self.id, pol.order_id.partner_id.id, pol.product_id.id))
+            if pol.price_unit != price:
+                to_write.setdefault(price, []).append(pol.id)
+        # the cells are synced right below, not again at commit time
+        order_lines = order_lines.with_context(prq_skip_quote_sync=True)
+        for price, ids in to_write.items():
+            order_lines.browse(ids).write({"price_unit": price})
+        if cells:
+            self._sync_quote_lines(cells=cells)
+        return cells
+
+    def _prepare_allocation_vals(self, alloc):
+        self.ensure_one()
+        return {
+            "request_id": self.id,
+            "product_id": alloc.get("product_id"),
+            "vendor_id": alloc.get("vendor_id"),
+            "qty_alloc": alloc.get("qty_alloc", 0.0),
+            "price_unit_alloc": alloc.get("price_unit_alloc", 0.0),
+            "currency_id": self.currency_id.id,
+            "taxes_id": [(6, 0, alloc.get("taxes_id", []))],
+        }
+
+    def _apply_allocations(self, allocations, product_ids=None):
+        """Replace the allocations of ``product_ids`` by ``allocations`` with a minimal set of writes.
+
+        The diff against the current allocations is computed in memory and the totals of
+        ``product_ids`` are validated before touching the database; then obsolete rows are
+        unlinked, new ones created and changed ones written, each in a single batch. Other
+        products are only validated on approval and PO creation, as a partial save (e.g. of
+        the matrix rows fetched so far) leaves them unallocated.
+
+        :param allocations: list of dicts {product_id, vendor_id, qty_alloc, price_unit_alloc, taxes_id};
+                            entries without a positive quantity are ignored
+        :param product_ids: products whose allocations are replaced, defaults to the products
+                            present in ``allocations``; allocations of other products are kept
+        """
+        self.ensure_one()
+        Allocation = self.env["so.purchase.request.allocation"]
+        incoming = {}
+        for alloc in allocations:
+            if alloc.get("qty_alloc", 0.0) > 0:
+                incoming[(alloc.get("product_id"), alloc.get("vendor_id"))] = alloc
+        if product_ids is None:
+            product_ids = {product_id for product_id, _vendor_id in incoming}
+        product_ids = set(product_ids)
+
+        existing = {}
+        to_unlink = Allocation
+        for alloc in self.allocation_ids:
+            product_id = alloc.product_id.id
+            if product_id not in product_ids:
+                continue
+            if (product_id, alloc.vendor_id.id) in existing:
+                to_unlink |= alloc
+            else:
+                existing[(product_id, alloc.vendor_id.id)] = alloc
+        totals = {}
+        for (product_id, _vendor_id), alloc in incoming.items():
+            totals[product_id] = totals.get(product_id, 0.0) + alloc.get("qty_alloc", 0.0)
+        self._check_allocation_totals(totals, product_ids=product_ids)
+
+        to_create = []
+        to_write = {}
+        for key, alloc in incoming.items():
+            vals = self._prepare_allocation_vals(alloc)
+            record = existing.pop(key, None)
+            if record is None:
+                to_create.append(vals)
+                continue
+            changes = _get_changed_vals(record, vals)
+            if changes:
+                to_write.setdefault(_freeze_vals(changes), (changes, []))[1].append(record.id)
+        to_unlink |= Allocation.union(*existing.values())
+        if to_unlink:
+            to_unlink.unlink()
+        if to_create:
+            Allocation.create(to_create)
+        for changes, ids in to_write.values():
+            Allocation.browse(ids).write(changes)
+        return True
+
+    def _get_allocation_problem(self):
+        """Solver inputs built from the request lines and quote lines.
+
+        Quotes without a price, from vendors no longer on the request, expired or over
+        the maximum lead time are excluded. A quoted quantity of zero means unbounded.
+
+        :return: tuple ``(product_ids, vendor_ids, prices, capacities, demand)`` where the
+                 arrays are indexed by [product, vendor] in company currency and request UoM
+        """
+        self.ensure_one()
+        today = fields.Date.context_today(self)
+        demand_by_product = {}
+        for line in self.line_ids:
+            demand_by_product.setdefault(line.product_id.id, line.qty_request)
+        product_ids = list(demand_by_product)
+        vendor_ids = self.vendor_ids.ids
+        row = {product_id: index for index, product_id in enumerate(product_ids)}
+        col = {vendor_id: index for index, vendor_id in enumerate(vendor_ids)}
+        prices = np.full((len(product_ids), len(vendor_ids)), np.inf)
+        capacities = np.full((len(product_ids), len(vendor_ids)), np.inf)
+        for quote in self.quote_line_ids:
+            product_index = row.get(quote.product_id.id)
+            vendor_index = col.get(quote.vendor_id.id)
+            if product_index is None or vendor_index is None or quote.normalized_price_unit <= 0:
+                continue
+            if self.solver_skip_expired_quotes and quote.validity_date and quote.validity_date < today:
+                continue
+            if self.solver_max_lead_time and quote.lead_time_days > self.solver_max_lead_time:
+                continue
+            prices[product_index, vendor_index] = quote.normalized_price_unit
+            if quote.normalized_qty > 0:
+                capacities[product_index, vendor_index] = quote.normalized_qty
+        demand = np.array([demand_by_product[product_id] for product_id in product_ids], dtype=float)
+        return product_ids, vendor_ids, prices, capacities, demand
+
+    def _compute_optimal_allocation(self):
+        """Replace the allocations by the cost-minimal allocation of the quoted prices."""
+        self.ensure_one()
+        product_ids, vendor_ids, prices, capacities, demand = self._get_allocation_problem()
+        alloc, unmet = solve_allocation(
+            prices, capacities, demand,
+            single_vendor=not self.approval_split_by_vendor,
+            max_vendors=self.solver_max_vendors,
+            min_order_value=self.solver_min_order_value,
+        )
+        missing = [product_ids[index] for index in np.flatnonzero(unmet > 1e-6)]
+        if missing:
+            raise UserError(_(
+                "No valid quotes cover the requested quantity of: %s",
+                ", ".join(self.env["product.product"].browse(missing).mapped("display_name")),
+            ))
+        allocations = [{
+            "product_id": product_ids[product_index],
+            "vendor_id": vendor_ids[vendor_index],
+            "qty_alloc": float(alloc[product_index, vendor_index]),
+            "price_unit_alloc": float(prices[product_index, vendor_index]),
+        } for product_index, vendor_index in zip(*np.nonzero(alloc > 1e-6))]
+        self._apply_allocations(allocations, product_ids=product_ids)
+        used_vendors = len({allocation["vendor_id"] for allocation in allocations})
+        if self.solver_max_vendors and used_vendors > self.solver_max_vendors:
+            self.message_post(body=_(
+                "The optimal allocation needs %(count)s vendors to cover the requested quantities, more than the maximum of %(max)s.",
+                count=used_vendors, max=self.solver_max_vendors,
+            ))
+        return True
+
+    @prq_instrument("action_compute_optimal_allocation")
+    def action_compute_optimal_allocation(self):
+        for request in self:
+            request._compute_optimal_allocation()
+        return True
+
     @api.model
-    def prq_save_allocations(self, request_id, allocations):
-        """allocations: list of dicts {product_id, vendor_id, qty_alloc, price_unit_alloc, taxes_id}"""
+    @prq_instrument("prq_save_allocations")
+    def prq_save_allocations(self, request_id, allocations, product_ids=None):
+        """allocations: list of dicts {product_id, vendor_id, qty_alloc, price_unit_alloc, taxes_id}
+
+        The allocations replace the current ones of ``product_ids`` (by default the products
+        present in ``allocations``); zero-quantity entries are no-ops. Only those products must
+        be fully allocated, the whole request is validated on approval.
+        """
         request = self.browse(request_id)
         request.check_access_rights("write")
         request.check_access_rule("write")
-        Allocation = self.env["so.purchase.request.allocation"]
-        if not request.approval_split_by_vendor:
-            existing = Allocation.search([
-                ("request_id", "=", request.id),
-            ], limit=1)
-            if existing:
-                existing.unlink()
-        print("allocations", allocations)
-        for alloc in allocations:
-            existing = Allocation.search([
-                ("request_id", "=", request.id),
-                ("product_id", "=", alloc.get("product_id")),
-                ("vendor_id", "=", alloc.get("vendor_id")),
-            ], limit=1)
-            if existing:
-                existing.unlink()
-            if alloc.get("qty_alloc", 0.0) > 0:
-                vals = {
-                    "request_id": request.id,
-                    "product_id": alloc.get("product_id"),
-                    "vendor_id": alloc.get("vendor_id"),
-                    "qty_alloc": alloc.get("qty_alloc", 0.0),
-                    "price_unit_alloc": alloc.get("price_unit_alloc", 0.0),
-                    "currency_id": request.currency_id.id,
-                    "taxes_id": [(6, 0, alloc.get("taxes_id", []))],
-                }
-                Allocation.create(vals)
-        # validate totals
-        request._validate_allocations()
+        request._apply_allocations(allocations, product_ids=product_ids)
         return True
 
 
@@ -355,11 +1648,40 @@ class PurchaseRequestLine(models.Model):
     _name = "so.purchase.request.line"
     _description = "Purchase Request Line"
 
-    request_id = fields.Many2one("so.purchase.request", string="Request", required=True, ondelete="cascade", index=True)
+    request_id = fields.Many2one("so.purchase.request", string="Request", required=True, ondelete="cascade")
     product_id = fields.Many2one("product.product", string="Product", required=True, ondelete="restrict", index=True)
     product_uom_id = fields.Many2one("uom.uom", string="UoM", required=True)
     qty_request = fields.Float(string="Requested Quantity", required=True, digits="Product Unit of Measure")
     description = fields.Text(string="Description")
+    sale_line_ids = fields.Many2many("sale.order.line", "so_prq_line_sale_line_rel", "request_line_id", "sale_line_id",
+                                     string="Sales Order Lines", copy=False)
+
+    def init(self):
+        super().init()
+        # the ORM keeps the index of a field whose index=True was removed
+        drop_index(self.env.cr, make_index_name(self._table, "request_id"), self._table)
+        # also serves the lookups on request_id alone
+        create_index(self.env.cr, "so_purchase_request_line_request_product_index", self._table, ["request_id", "product_id"])
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        lines = super().create(vals_list)
+        lines.request_id._mark_matrix_dirty()
+        lines.request_id._mark_vendor_summary_dirty()
+        return lines
+
+    def write(self, vals):
+        requests = self.request_id
+        res = super().write(vals)
+        (requests | self.request_id)._mark_matrix_dirty()
+        if "product_id" in vals or "request_id" in vals:
+            (requests | self.request_id)._mark_vendor_summary_dirty()
+        return res
+
+    def unlink(self):
+        self.request_id._mark_matrix_dirty()
+        self.request_id._mark_vendor_summary_dirty()
+        return super().unlink()
 
     @api.onchange("product_id")
     def _onchange_product_id(self):
@@ -373,7 +1695,7 @@ class PurchaseRequestQuoteLine(models.Model):
     _description = "Purchase Request Quote Line"
     _rec_name = "display_name"
 
-    request_id = fields.Many2one("so.purchase.request", string="Request", required=True, ondelete="cascade", index=True)
+    request_id = fields.Many2one("so.purchase.request", string="Request", required=True, ondelete="cascade")
     vendor_id = fields.Many2one("res.partner", string="Vendor", required=True, ondelete="restrict", index=True)
     product_id = fields.Many2one("product.product", string="Product", required=True, ondelete="restrict", index=True)
     product_uom_id = fields.Many2one("uom.uom", string="Vendor UoM", required=True)
@@ -392,10 +1714,46 @@ class PurchaseRequestQuoteLine(models.Model):
     normalized_qty = fields.Float(string="Qty (Request UoM)", compute="_compute_normalized", store=True, digits="Product Unit of Measure")
     company_currency_id = fields.Many2one("res.currency", string="Company Currency", related="request_id.currency_id", store=True, readonly=True)
 
+    # the unique index also serves the (request_id, vendor_id, product_id) lookups and those on request_id alone
     _sql_constraints = [
         ("unique_vendor_product", "unique(request_id,vendor_id,product_id)", "Each vendor can have only one quote per product in a request."),
     ]
 
+    def init(self):
+        super().init()
+        # the ORM keeps the index of a field whose index=True was removed
+        drop_index(self.env.cr, make_index_name(self._table, "request_id"), self._table)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        records._mark_matrix_cells_dirty()
+        records._mark_vendor_summary_dirty()
+        return records
+
+    def write(self, vals):
+        summary_changed = not VENDOR_SUMMARY_QUOTE_FIELDS.isdisjoint(vals)
+        if not MATRIX_CELL_FIELDS.isdisjoint(vals):
+            # the cells the records leave must be refreshed as well
+            self._mark_matrix_cells_dirty()
+            self._mark_vendor_summary_dirty()
+        res = super().write(vals)
+        self._mark_matrix_cells_dirty()
+        if summary_changed:
+            self._mark_vendor_summary_dirty()
+        return res
+
+    def unlink(self):
+        self._mark_matrix_cells_dirty()
+        self._mark_vendor_summary_dirty()
+        return super().unlink()
+
+    def _mark_matrix_cells_dirty(self):
+        self.request_id._mark_matrix_dirty({(rec.request_id.id, rec.product_id.id, rec.vendor_id.id) for rec in self})
+
+    def _mark_vendor_summary_dirty(self):
+        self.request_id._mark_vendor_summary_dirty({(rec.request_id.id, rec.vendor_id.id) for rec in self})
+
     @api.depends("vendor_id", "product_id")
     def _compute_display_name(self):
         for rec in self:
@@ -413,27 +1771,23 @@ class PurchaseRequestQuoteLine(models.Model):
         "request_id.line_ids.product_uom_id",
     )
     def _compute_normalized(self):
+        cache = NormalizationCache(self.env)
+        cache.prefetch_request_lines(self.request_id)
+        today = fields.Date.context_today(self)
         for rec in self:
             # convert qty to request line uom
-            request_line = self.env["so.purchase.request.line"].search([
-                ("request_id", "=", rec.request_id.id),
-                ("product_id", "=", rec.product_id.id),
-            ], limit=1)
-            req_uom = request_line.product_uom_id if request_line else rec.product_id.uom_po_id
-            normalized_qty = rec.product_uom_id._compute_quantity(rec.qty_quote or 0.0, req_uom, rounding_method="HALF-UP") if rec.product_uom_id and req_uom else rec.qty_quote or 0.0
+            req_uom = cache.request_uom(rec.request_id, rec.product_id)
+            rec.normalized_qty = cache.quantity(rec.qty_quote or 0.0, rec.product_uom_id, req_uom)
             # convert price to company currency
-            price = rec.price_unit_quote or 0.0
-            company_currency = rec.request_id.company_id.currency_id
-            price_company = rec.currency_id._convert(price, company_currency, rec.request_id.company_id, fields.Date.context_today(self))
-            rec.normalized_qty = normalized_qty
-            rec.normalized_price_unit = price_company
+            company = rec.request_id.company_id
+            rec.normalized_price_unit = cache.convert(rec.price_unit_quote or 0.0, rec.currency_id, company.currency_id, company, today)
 
 
 class PurchaseRequestAllocation(models.Model):
     _name = "so.purchase.request.allocation"
     _description = "Purchase Request Allocation"
 
-    request_id = fields.Many2one("so.purchase.request", string="Request", required=True, ondelete="cascade", index=True)
+    request_id = fields.Many2one("so.purchase.request", string="Request", required=True, ondelete="cascade")
     product_id = fields.Many2one("product.product", string="Product", required=True, ondelete="restrict", index=True)
     vendor_id = fields.Many2one("res.partner", string="Vendor", required=True, ondelete="restrict", domain=[("supplier_rank", ">", 0)], index=True)
     qty_alloc = fields.Float(string="Allocated Qty", required=True, digits="Product Unit of Measure")
@@ -445,6 +1799,35 @@ class PurchaseRequestAllocation(models.Model):
     quote_line_id = fields.Many2one("so.purchase.request.quote.line", string="Related Quote", ondelete="set null")
     product_uom_id = fields.Many2one("uom.uom", string="Request UoM", compute="_compute_request_uom", store=False)
 
+    def init(self):
+        super().init()
+        # the ORM keeps the index of a field whose index=True was removed
+        drop_index(self.env.cr, make_index_name(self._table, "request_id"), self._table)
+        # also serves the lookups on request_id alone
+        create_index(self.env.cr, "so_purchase_request_allocation_request_vendor_product_index", self._table,
+                     ["request_id", "vendor_id", "product_id"])
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        records._mark_matrix_cells_dirty()
+        return records
+
+    def write(self, vals):
+        if not MATRIX_CELL_FIELDS.isdisjoint(vals):
+            # the cells the records leave must be refreshed as well
+            self._mark_matrix_cells_dirty()
+        res = super().write(vals)
+        self._mark_matrix_cells_dirty()
+        return res
+
+    def unlink(self):
+        self._mark_matrix_cells_dirty()
+        return super().unlink()
+
+    def _mark_matrix_cells_dirty(self):
+        self.request_id._mark_matrix_dirty({(rec.request_id.id, rec.product_id.id, rec.vendor_id.id) for rec in self})
+
     @api.constrains("qty_alloc")
     def _check_positive_qty(self):
         for rec in self:
@@ -452,9 +1835,7 @@ class PurchaseRequestAllocation(models.Model):
                 raise ValidationError(_("Allocated quantity must be positive."))
 
     def _compute_request_uom(self):
+        cache = NormalizationCache(self.env)
+        cache.prefetch_request_lines(self.request_id)
         for rec in self:
-            req_line = self.env["so.purchase.request.line"].search([
-                ("request_id", "=", rec.request_id.id),
-                ("product_id", "=", rec.product_id.id),
-            ], limit=1)
-            rec.product_uom_id = req_line.product_uom_id or rec.product_id.uom_po_id
+            rec.product_uom_id = cache.request_uom(rec.request_id, rec.product_id)
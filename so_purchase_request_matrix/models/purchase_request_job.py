@@ -0,0 +1,86 @@
+import logging
+import threading
+
+from odoo import api, fields, models
+
+_logger = logging.getLogger(__name__)
+
+# Jobs processed per run of the background job cron
+JOB_BATCH_SIZE = 20
+# Failed runs after which a job is left in the failed state
+JOB_MAX_ATTEMPTS = 3
+
+
+class PurchaseRequestJob(models.Model):
+    _name = "so.purchase.request.job"
+    _description = "Purchase Request Background Job"
+    _order = "id"
+
+    request_id = fields.Many2one("so.purchase.request", string="Purchase Request", required=True, ondelete="cascade", index=True)
+    job_type = fields.Selection([
+        ("create_rfqs", "Create RFQs"),
+        ("sync_quotes", "Sync Quotes"),
+        ("create_pos", "Create POs"),
+    ], string="Operation", required=True)
+    vendor_ids = fields.Many2many("res.partner", "so_prq_job_vendor_rel", "job_id", "vendor_id", string="Vendors")
+    state = fields.Selection([
+        ("pending", "Pending"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    ], string="Status", default="pending", required=True, index=True)
+    attempts = fields.Integer(string="Attempts", readonly=True)
+    error = fields.Text(string="Error", readonly=True)
+
+    def _execute(self):
+        """Run the chunk of work of the job.
+
+        Vendors already served by an RFQ or a final PO are skipped, so that re-running
+        a job, or running it after its work was partially done, creates no duplicates.
+        """
+        self.ensure_one()
+        request = self.request_id
+        if self.job_type == "create_rfqs":
+            request._create_missing_rfqs(self.vendor_ids)
+        elif self.job_type == "sync_quotes":
+            request._sync_quote_lines(vendors=self.vendor_ids)
+        elif self.job_type == "create_pos":
+            request._create_missing_final_pos(self.vendor_ids)
+
+    def _run(self):
+        """Execute the job in a savepoint and record its outcome.
+
+        A failing job is rolled back and stays pending until it failed ``JOB_MAX_ATTEMPTS`` times.
+        """
+        self.ensure_one()
+        try:
+            with self.env.cr.savepoint():
+                self._execute()
+        except Exception as e:
+            _logger.warning("Purchase request job %s failed", self.id, exc_info=True)
+            attempts = self.attempts + 1
+            self.write({
+                "attempts": attempts,
+                "error": str(e),
+                "state": "failed" if attempts >= JOB_MAX_ATTEMPTS else "pending",
+            })
+        else:
+            self.write({"attempts": self.attempts + 1, "error": False, "state": "done"})
+        self.request_id._finalize_jobs(self.job_type)
+
+    def action_retry(self):
+        self.filtered(lambda j: j.state == "failed").write({"state": "pending", "attempts": 0})
+        self.env.ref("so_purchase_request_matrix.ir_cron_prq_process_jobs").sudo()._trigger()
+        return True
+
+    @api.model
+    def _cron_process_jobs(self, limit=JOB_BATCH_SIZE):
+        """Run pending jobs, committing after each of them outside of tests."""
+        auto_commit = not getattr(threading.current_thread(), "testing", False)
+        jobs = self.search([("state", "=", "pending")], limit=limit)
+        for job in jobs:
+            job._run()
+            if auto_commit:
+                self.env.cr.commit()
+        if self.search_count([("state", "=", "pending")], limit=1):
+            self.env.ref("so_purchase_request_matrix.ir_cron_prq_process_jobs")._trigger()
+        return True
@@ -1,11 +1,16 @@
 from odoo import api, fields, models, _
 from odoo.exceptions import UserError
 
+# Sales orders processed per run of the background purchase request creation
+PURCHASE_REQUEST_CHUNK_SIZE = 100
+
 
 class SaleOrder(models.Model):
     _inherit = "sale.order"
 
     so_purchase_request_id = fields.Many2one("so.purchase.request", string="Purchase Request", readonly=True, copy=False)
+    so_purchase_request_pending = fields.Boolean(string="Purchase Request Pending", readonly=True, copy=False,
+                                                 help="A purchase request will be created for this order in the background.")
 
     def action_open_purchase_request(self):
         self.ensure_one()
@@ -20,6 +25,15 @@ class SaleOrder(models.Model):
         }
 
     def action_create_purchase_request_wizard(self):
+        if len(self) > 1:
+            return {
+                "type": "ir.actions.act_window",
+                "name": _("Create Purchase Requests"),
+                "res_model": "so.create.purchase.request.wizard",
+                "view_mode": "form",
+                "target": "new",
+                "context": {"default_sale_order_ids": [(6, 0, self.ids)]},
+            }
         self.ensure_one()
         if self.so_purchase_request_id:
             return self.action_open_purchase_request()
@@ -32,3 +46,73 @@ class SaleOrder(models.Model):
             "context": {"default_sale_order_id": self.id},
         }
 
+    def _get_purchase_request_lines(self):
+        self.ensure_one()
+        return self.order_line.filtered(lambda l: not l.display_type and l.product_id)
+
+    def _create_purchase_requests(self, note=False):
+        """Create one purchase request per order in ``self`` with batched creates.
+
+        Orders that already have a request or no product line are skipped.
+
+        :return: the created requests
+        """
+        Request = self.env["so.purchase.request"]
+        orders = self.filtered(lambda o: not o.so_purchase_request_id and o._get_purchase_request_lines())
+        if not orders:
+            return Request
+        names = Request._get_next_names(len(orders))
+        requests = Request.create([{
+            "name": name,
+            "sale_order_id": order.id,
+            "note": note or False,
+        } for order, name in zip(orders, names)])
+        lines_vals = []
+        for order, request in zip(orders, requests):
+            lines_vals += [request._prepare_line_from_sale_line(so_line) for so_line in order._get_purchase_request_lines()]
+        self.env["so.purchase.request.line"].create(lines_vals)
+        order_ids_by_request = {}
+        for order, request in zip(orders, requests):
+            order_ids_by_request.setdefault(request.id, []).append(order.id)
+        for request_id, order_ids in order_ids_by_request.items():
+            orders.browse(order_ids).write({"so_purchase_request_id": request_id})
+        return requests
+
+    def _create_consolidated_purchase_request(self, note=False):
+        """Create a single purchase request aggregating the demand of the orders in ``self``.
+
+        Orders that already have a request or no product line are skipped.
+
+        :return: the created request
+        """
+        Request = self.env["so.purchase.request"]
+        orders = self.filtered(lambda o: not o.so_purchase_request_id and o._get_purchase_request_lines())
+        if not orders:
+            return Request
+        if len(orders.company_id) > 1:
+            raise UserError(_("A consolidated Purchase Request can only gather Sales Orders of a single company."))
+        request = Request.create({
+            "is_consolidated": True,
+            "sale_order_ids": [(6, 0, orders.ids)],
+            "company_id": orders[0].company_id.id,
+            "note": note or False,
+        })
+        so_lines = self.env["sale.order.line"].concat(*(order._get_purchase_request_lines() for order in orders))
+        self.env["so.purchase.request.line"].create(request._prepare_lines_from_sale_lines_consolidated(so_lines))
+        orders.so_purchase_request_id = request.id
+        return request
+
+    def _enqueue_purchase_requests(self):
+        """Flag the orders for the background purchase request creation."""
+        self.filtered(lambda o: not o.so_purchase_request_id).so_purchase_request_pending = True
+        self.env.ref("so_purchase_request_matrix.ir_cron_prq_create_pending_requests")._trigger()
+
+    @api.model
+    def _cron_create_pending_purchase_requests(self, limit=PURCHASE_REQUEST_CHUNK_SIZE):
+        orders = self.search([("so_purchase_request_pending", "=", True)], limit=limit)
+        orders._create_purchase_requests()
+        orders.so_purchase_request_pending = False
+        if len(orders) == limit:
+            self.env.ref("so_purchase_request_matrix.ir_cron_prq_create_pending_requests")._trigger()
+        return True
+
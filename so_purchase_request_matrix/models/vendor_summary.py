@@ -0,0 +1,121 @@
+from odoo import api, fields, models
+
+from .normalization_cache import NormalizationCache
+from .purchase_request import _get_changed_vals
+
+
+class PurchaseRequestVendorSummary(models.Model):
+    _name = "so.purchase.request.vendor.summary"
+    _description = "Purchase Request Vendor Summary"
+    _order = "request_id desc, coverage desc, rfq_amount, id"
+
+    request_id = fields.Many2one("so.purchase.request", string="Purchase Request", required=True, ondelete="cascade", index=True)
+    vendor_id = fields.Many2one("res.partner", string="Vendor", required=True, ondelete="cascade")
+    currency_id = fields.Many2one("res.currency", string="Company Currency", related="request_id.currency_id", store=True, readonly=True)
+    date_planned = fields.Datetime(string="Earliest Planned Date", readonly=True)
+    payment_term_id = fields.Many2one("account.payment.term", string="Payment Term", readonly=True)
+    rfq_amount = fields.Monetary(string="RFQ Untaxed Total", currency_field="currency_id", readonly=True,
+                                 help="Untaxed total of the vendor's RFQs, in company currency.")
+    quoted_count = fields.Integer(string="Quoted Products", readonly=True)
+    coverage = fields.Float(string="Coverage (%)", digits=(16, 2), readonly=True,
+                            help="Share of the requested products the vendor quoted a price for.")
+
+    _sql_constraints = [
+        ("request_vendor_unique", "unique(request_id, vendor_id)", "A vendor can only have one summary per purchase request."),
+    ]
+
+    @api.model
+    def _refresh(self, vendors_by_request):
+        """Recompute the summaries from the RFQs and quote lines with a few aggregate queries.
+
+        :param vendors_by_request: dict {request_id: set of vendor ids, or ``None`` for all
+                                   the vendors of the request}
+        """
+        # the summaries of archived requests stand in for their deleted quote lines
+        requests = self.env["so.purchase.request"].browse(list(vendors_by_request)).exists().filtered(lambda r: not r.is_archived)
+        if not requests:
+            return
+        self.env.flush_all()
+        cr = self.env.cr
+        Currency = self.env["res.currency"]
+        cache = NormalizationCache(self.env)
+        today = fields.Date.context_today(self)
+
+        def wanted(request_id, vendor_id):
+            vendor_ids = vendors_by_request.get(request_id)
+            return vendor_ids is None or vendor_id in vendor_ids
+
+        values = {}
+
+        def summary(request_id, vendor_id):
+            return values.setdefault((request_id, vendor_id), {
+                "request_id": request_id,
+                "vendor_id": vendor_id,
+                "date_planned": False,
+                "payment_term_id": False,
+                "rfq_amount": 0.0,
+                "quoted_count": 0,
+                "coverage": 0.0,
+            })
+
+        for request in requests:
+            for vendor_id in request.vendor_ids.ids:
+                if wanted(request.id, vendor_id):
+                    summary(request.id, vendor_id)
+        cr.execute("""
+            SELECT po.so_request_id, po.partner_id, po.currency_id, MIN(pol.date_planned), SUM(pol.price_subtotal)
+              FROM purchase_order_line pol
+              JOIN purchase_order po ON po.id = pol.order_id
+             WHERE po.so_request_id IN %s AND po.is_final_po IS NOT TRUE AND po.active
+          GROUP BY po.so_request_id, po.partner_id, po.currency_id
+        """, [tuple(requests.ids)])
+        for request_id, vendor_id, currency_id, date_planned, amount in cr.fetchall():
+            if not wanted(request_id, vendor_id):
+                continue
+            vals = summary(request_id, vendor_id)
+            if date_planned and (not vals["date_planned"] or date_planned < vals["date_planned"]):
+                vals["date_planned"] = date_planned
+            request = requests.browse(request_id)
+            vals["rfq_amount"] += cache.convert(amount or 0.0, Currency.browse(currency_id), request.currency_id, request.company_id, today)
+        cr.execute("""
+            SELECT DISTINCT ON (so_request_id, partner_id) so_request_id, partner_id, payment_term_id
+              FROM purchase_order
+             WHERE so_request_id IN %s AND is_final_po IS NOT TRUE AND active AND payment_term_id IS NOT NULL
+          ORDER BY so_request_id, partner_id, id
+        """, [tuple(requests.ids)])
+        for request_id, vendor_id, payment_term_id in cr.fetchall():
+            if wanted(request_id, vendor_id):
+                summary(request_id, vendor_id)["payment_term_id"] = payment_term_id
+        product_counts = {
+            request.id: count
+            for request, count in self.env["so.purchase.request.line"]._read_group(
+                [("request_id", "in", requests.ids)], ["request_id"], ["product_id:count_distinct"],
+            )
+        }
+        quoted = self.env["so.purchase.request.quote.line"]._read_group(
+            [("request_id", "in", requests.ids), ("price_unit_quote", ">", 0)],
+            ["request_id", "vendor_id"], ["product_id:count_distinct"],
+        )
+        for request, vendor, count in quoted:
+            if not wanted(request.id, vendor.id):
+                continue
+            vals = summary(request.id, vendor.id)
+            vals["quoted_count"] = count
+            total = product_counts.get(request.id)
+            vals["coverage"] = 100.0 * count / total if total else 0.0
+
+        to_unlink = self.browse()
+        for record in self.search([("request_id", "in", requests.ids)]):
+            key = (record.request_id.id, record.vendor_id.id)
+            if not wanted(*key):
+                continue
+            vals = values.pop(key, None)
+            if vals is None:
+                to_unlink |= record
+                continue
+            changes = _get_changed_vals(record, vals)
+            if changes:
+                record.write(changes)
+        to_unlink.unlink()
+        if values:
+            self.create(list(values.values()))
@@ -1,23 +1,48 @@
 /** @odoo-module **/
 import { registry } from "@web/core/registry";
-import { Component, useState, onWillStart, onMounted, onWillUnmount } from "@odoo/owl";
+import { Component, useState, useRef, markRaw, onWillStart, onMounted, onWillUnmount } from "@odoo/owl";
 import { useService } from "@web/core/utils/hooks";
 import { _t } from "@web/core/l10n/translation";
 
+// Request lines fetched per call, and rows rendered outside the viewport
+const PAGE_SIZE = 100;
+const OVERSCAN = 10;
+// Fixed row heights (px) used to position the rendered window inside the scroll area
+const ROW_HEIGHT = 64;
+const SPLIT_ROW_HEIGHT = 104;
+// Fetched pages kept across widget instances, revalidated with their matrix version
+const SNAPSHOT_CACHE_SIZE = 50;
+const snapshotCache = new Map();
+
 class PrqMatrix extends Component {
     setup() {
         this.orm = useService("orm");
         this.busService = useService("bus_service");
         this.notification = useService("notification");
+        this.wrapperRef = useRef("wrapper");
         this.state = useState({
             loading: true,
-            data: null,
+            header: null, // request info and vendor columns
+            total: 0, // number of request lines matching the filters
+            pages: {}, // page number -> columnar window returned by prq_get_matrix_grid
             allocations: {}, // key: productId-vendorId -> {qty, price}
+            bestByProduct: {},
+            filters: { search: "", onlyUnallocated: false },
+            version: 0, // last matrix_version received from the server
+            scrollTop: 0,
+            viewportHeight: 600,
         });
+        this._pendingPages = new Set();
+        this._generation = 0;
+        this._rowsByProduct = {}; // productId -> [[pageNumber, row], ...] of the fetched pages
+        this._onBusNotification = this.onMatrixUpdate.bind(this);
         this._subscribeBus();
         onWillStart(async () => {
             await this.load();
         });
+        onMounted(() => {
+            this._measureViewport();
+        });
         onWillUnmount(() => {
             this._unsubscribeBus();
         });
@@ -25,52 +50,263 @@ class PrqMatrix extends Component {
     get requestId() {
         return this.props.record.resId || (this.props.record.data && this.props.record.data.id);
     }
+    get rowHeight() {
+        return this.state.header?.approval_split_by_vendor ? SPLIT_ROW_HEIGHT : ROW_HEIGHT;
+    }
+    get visibleRange() {
+        const first = Math.floor(this.state.scrollTop / this.rowHeight);
+        const count = Math.ceil(this.state.viewportHeight / this.rowHeight);
+        const start = Math.max(0, first - OVERSCAN);
+        const end = Math.min(this.state.total, first + count + OVERSCAN);
+        return [start, Math.max(start, end)];
+    }
+    /**
+     * Rows of the rendered window. Rows whose page is not fetched yet have no `page`
+     * and are rendered as placeholders.
+     */
+    get visibleRows() {
+        const [start, end] = this.visibleRange;
+        const rows = [];
+        for (let index = start; index < end; index++) {
+            const page = this.state.pages[Math.floor(index / PAGE_SIZE)] || null;
+            const row = index % PAGE_SIZE;
+            rows.push({ index, page, row, productId: page ? page.lines.product_ids[row] : null });
+        }
+        return rows;
+    }
+    get topPadding() {
+        return this.visibleRange[0] * this.rowHeight;
+    }
+    get bottomPadding() {
+        return (this.state.total - this.visibleRange[1]) * this.rowHeight;
+    }
+    /**
+     * (Re)load the matrix from scratch: drop the fetched pages and local edits,
+     * then fetch the pages of the current window.
+     */
     async load() {
-        const data = await this.orm.call("so.purchase.request", "prq_get_matrix_data", [this.requestId]);
-        console.log("PRQ matrix: Loaded data", data);
-        const allocs = {};
-        for (const line of data.lines) {
-            for (const a of (line.allocations || [])) {
-                allocs[`${line.product_id}-${a.vendor_id}`] = { qty: a.qty_alloc, price: a.price_unit_alloc || 0 };
+        this._generation++;
+        this._pendingPages.clear();
+        this.state.pages = {};
+        this.state.allocations = {};
+        this.state.bestByProduct = {};
+        this._rowsByProduct = {};
+        await this._ensureVisiblePages();
+        this.state.loading = false;
+    }
+    async _ensureVisiblePages() {
+        const [start, end] = this.visibleRange;
+        const firstPage = Math.floor(start / PAGE_SIZE);
+        const lastPage = Math.max(firstPage, Math.floor(Math.max(end - 1, 0) / PAGE_SIZE));
+        const fetches = [];
+        for (let pageNumber = firstPage; pageNumber <= lastPage; pageNumber++) {
+            fetches.push(this._fetchPage(pageNumber));
+        }
+        await Promise.all(fetches);
+    }
+    async _fetchPage(pageNumber) {
+        if (this.state.pages[pageNumber] || this._pendingPages.has(pageNumber)) {
+            return;
+        }
+        const generation = this._generation;
+        const filters = this.state.filters;
+        const cached = snapshotCache.get(this._snapshotKey(pageNumber));
+        this._pendingPages.add(pageNumber);
+        try {
+            let data = await this.orm.call("so.purchase.request", "prq_get_matrix_grid", [this.requestId], {
+                offset: pageNumber * PAGE_SIZE,
+                limit: PAGE_SIZE,
+                search: filters.search || null,
+                only_unallocated: filters.onlyUnallocated,
+                known_version: cached ? cached.version : null,
+            });
+            if (data.not_modified) {
+                data = cached;
+            } else {
+                this._storeSnapshot(pageNumber, data);
+            }
+            if (generation === this._generation) {
+                this._ingestPage(pageNumber, data);
+            }
+        } finally {
+            if (generation === this._generation) {
+                this._pendingPages.delete(pageNumber);
             }
         }
-        const bestByProduct = {};
-        for (const line of data.lines) {
-            let bestVendorId = null;
-            let bestPrice = Infinity;
-            for (const v of data.vendors) {
-                const cell = (line.quotes || {})[v.id] || (line.quotes || {})[String(v.id)];
-                if (cell && typeof cell.normalized_price_unit === "number" && cell.normalized_price_unit > 0) {
-                    if (cell.normalized_price_unit < bestPrice) {
-                        bestPrice = cell.normalized_price_unit;
-                        bestVendorId = v.id;
+    }
+    _snapshotKey(pageNumber) {
+        const filters = this.state.filters;
+        return `${this.requestId}|${filters.search}|${filters.onlyUnallocated}|${pageNumber}`;
+    }
+    _storeSnapshot(pageNumber, data) {
+        const key = this._snapshotKey(pageNumber);
+        snapshotCache.delete(key);
+        snapshotCache.set(key, data);
+        if (snapshotCache.size > SNAPSHOT_CACHE_SIZE) {
+            snapshotCache.delete(snapshotCache.keys().next().value);
+        }
+    }
+    /**
+     * The payload is columnar: `vendors` and `lines` hold parallel arrays and the
+     * quote/allocation values are row-major grids indexed by [line row][vendor column].
+     */
+    _ingestPage(pageNumber, data) {
+        data.lines.product_ids.forEach((productId, row) => {
+            (this._rowsByProduct[productId] ||= []).push([pageNumber, row]);
+            data.vendors.ids.forEach((vendorId, col) => {
+                const qty = data.alloc_qty[row][col];
+                if (qty !== null) {
+                    this.state.allocations[this._getAllocKey(productId, vendorId)] = { qty, price: data.alloc_price[row][col] || 0 };
+                }
+            });
+            this._computeBestVendor(data, row);
+        });
+        this.state.header = {
+            id: data.id,
+            name: data.name,
+            approval_split_by_vendor: data.approval_split_by_vendor,
+            company_currency: data.company_currency,
+            job_running: data.job_running,
+            job_progress: data.job_progress,
+            vendors: data.vendors,
+        };
+        this.state.total = data.total_lines;
+        this.state.version = Math.max(this.state.version, data.version);
+        this.state.pages[pageNumber] = markRaw(data);
+    }
+    _computeBestVendor(page, row) {
+        let bestVendorId = null;
+        let bestPrice = Infinity;
+        page.vendors.ids.forEach((vendorId, col) => {
+            const normalized = page.normalized_price[row][col];
+            if (typeof normalized === "number" && normalized > 0 && normalized < bestPrice) {
+                bestPrice = normalized;
+                bestVendorId = vendorId;
+            }
+        });
+        const productId = page.lines.product_ids[row];
+        if (bestVendorId !== null) {
+            this.state.bestByProduct[productId] = bestVendorId;
+        } else {
+            delete this.state.bestByProduct[productId];
+        }
+    }
+    /**
+     * Bus notification of a committed matrix change. Cell deltas are patched into the
+     * fetched pages; structural changes, or a gap in the versions (missed notification),
+     * trigger a reload.
+     */
+    async onMatrixUpdate(payload) {
+        if (payload.request_id !== this.requestId || payload.version <= this.state.version) {
+            return;
+        }
+        if (payload.full || payload.version !== this.state.version + 1) {
+            await this.load();
+            return;
+        }
+        const touchedPages = new Set();
+        for (const cell of payload.cells) {
+            const col = this.state.header.vendors.ids.indexOf(cell.vendor_id);
+            if (col < 0) {
+                continue;
+            }
+            for (const [pageNumber, row] of this._rowsByProduct[cell.product_id] || []) {
+                const page = this.state.pages[pageNumber];
+                if (!page) {
+                    continue;
+                }
+                const quote = cell.quote;
+                let currencyIdx = null;
+                if (quote) {
+                    currencyIdx = page.currencies.indexOf(quote.currency);
+                    if (currencyIdx < 0) {
+                        currencyIdx = page.currencies.push(quote.currency) - 1;
                     }
                 }
+                page.price[row][col] = quote ? quote.price_unit : null;
+                page.currency[row][col] = currencyIdx;
+                page.normalized_price[row][col] = quote ? quote.normalized_price_unit : null;
+                page.hist_median[row][col] = quote ? quote.hist_median : null;
+                page.outlier[row][col] = quote ? quote.outlier : null;
+                page.alloc_qty[row][col] = cell.allocation ? cell.allocation.qty : null;
+                page.alloc_price[row][col] = cell.allocation ? cell.allocation.price : null;
+                this._computeBestVendor(page, row);
+                touchedPages.add(pageNumber);
             }
-            if (bestVendorId !== null) {
-                bestByProduct[line.product_id] = bestVendorId;
+            const key = this._getAllocKey(cell.product_id, cell.vendor_id);
+            if (cell.allocation) {
+                this.state.allocations[key] = { qty: cell.allocation.qty, price: cell.allocation.price };
+            } else {
+                delete this.state.allocations[key];
             }
         }
-        this.state.data = data;
-        this.state.allocations = allocs;
-        this.state.bestByProduct = bestByProduct;
-        this.state.loading = false;
+        // every fetched page is now up to date; pages are raw objects, so they are
+        // re-assigned to re-render the patched rows
+        for (const [pageNumber, page] of Object.entries(this.state.pages)) {
+            const patched = markRaw({ ...page, version: payload.version });
+            this._storeSnapshot(pageNumber, patched);
+            if (touchedPages.has(Number(pageNumber))) {
+                this.state.pages[pageNumber] = patched;
+            }
+        }
+        this.state.version = payload.version;
+    }
+    getQuote(page, row, col) {
+        if (page.price[row][col] === null) {
+            return null;
+        }
+        return {
+            price_unit: page.price[row][col],
+            currency: page.currencies[page.currency[row][col]],
+            normalized_price_unit: page.normalized_price[row][col],
+            hist_median: page.hist_median[row][col],
+            outlier: page.outlier[row][col],
+        };
+    }
+    _measureViewport() {
+        const el = this.wrapperRef.el;
+        if (el) {
+            this.state.viewportHeight = el.clientHeight || this.state.viewportHeight;
+            this.state.scrollTop = el.scrollTop;
+        }
+    }
+    onScroll() {
+        this._measureViewport();
+        this._ensureVisiblePages();
+    }
+    async _applyFilters() {
+        if (this.wrapperRef.el) {
+            this.wrapperRef.el.scrollTop = 0;
+        }
+        this.state.scrollTop = 0;
+        await this.load();
+    }
+    async onSearchChange(ev) {
+        this.state.filters.search = (ev.target.value || "").trim();
+        await this._applyFilters();
+    }
+    async onToggleUnallocated(ev) {
+        this.state.filters.onlyUnallocated = !!ev.target.checked;
+        await this._applyFilters();
+    }
+    get busChannel() {
+        return `so_prq_matrix_${this.requestId}`;
     }
     _subscribeBus() {
         try {
-            this.busService.addChannel("so_prq_matrix");
-            console.log("PRQ matrix: Bus Service subscribed to so_prq_matrix");
+            this.busService.addChannel(this.busChannel);
+            this.busService.subscribe("prq_matrix_update", this._onBusNotification);
         } catch (e) {
             console.warn("PRQ matrix: Bus Service subscribe failed", e);
         }
     }
     _unsubscribeBus() {
         try {
-            console.log("PRQ matrix: Bus Service unsubscribed from so_prq_matrix");
+            this.busService.unsubscribe("prq_matrix_update", this._onBusNotification);
             if (this.busService.deleteChannel) {
-                this.busService.deleteChannel("so_prq_matrix");
+                this.busService.deleteChannel(this.busChannel);
             } else if (this.busService.removeChannel) {
-                this.busService.removeChannel("so_prq_matrix");
+                this.busService.removeChannel(this.busChannel);
             }
         } catch {
             // ignore
@@ -79,23 +315,25 @@ class PrqMatrix extends Component {
     _getAllocKey(productId, vendorId) {
         return `${productId}-${vendorId}`;
     }
-    onChangeQty(ev, productId, vendorId) {
+    onChangeQty(ev, entry, col) {
+        const header = this.state.header;
+        const productId = entry.productId;
+        const vendorId = header.vendors.ids[col];
         const key = this._getAllocKey(productId, vendorId);
         const value = parseFloat(ev.target.value || "0") || 0;
         const current = this.state.allocations[key] || { qty: 0, price: 0 };
         // If split mode and price not set yet, default from RFQ when user assigns qty
-        if (this.state.data?.approval_split_by_vendor && value > 0 && (!current.price || Number(current.price) === 0)) {
-            const line = (this.state.data.lines || []).find((l) => l.product_id === productId);
-            const cell = (line?.quotes || {})[vendorId] || (line?.quotes || {})[String(vendorId)] || {};
-            const defaultPrice = Number(cell.price_unit) || Number(cell.normalized_price_unit) || 0;
+        if (header.approval_split_by_vendor && value > 0 && (!current.price || Number(current.price) === 0)) {
+            const quote = this.getQuote(entry.page, entry.row, col) || {};
+            const defaultPrice = Number(quote.price_unit) || Number(quote.normalized_price_unit) || 0;
             this.state.allocations[key] = { qty: value, price: defaultPrice };
         } else {
             this.state.allocations[key] = { ...current, qty: value };
         }
-        if (!this.state.data?.approval_split_by_vendor) {
-            for (const v of (this.state.data?.vendors || [])) {
-                if (v.id === vendorId) continue;
-                const k = this._getAllocKey(productId, v.id);
+        if (!header.approval_split_by_vendor) {
+            for (const otherVendorId of header.vendors.ids) {
+                if (otherVendorId === vendorId) continue;
+                const k = this._getAllocKey(productId, otherVendorId);
                 const cur = this.state.allocations[k];
                 if (cur && cur.qty) {
                     this.state.allocations[k] = { ...cur, qty: 0 };
@@ -103,24 +341,24 @@ class PrqMatrix extends Component {
             }
         }
     }
-    onChangePrice(ev, productId, vendorId) {
-        const key = this._getAllocKey(productId, vendorId);
+    onChangePrice(ev, entry, col) {
+        const key = this._getAllocKey(entry.productId, this.state.header.vendors.ids[col]);
         const value = parseFloat(ev.target.value || "0") || 0;
         const current = this.state.allocations[key] || { qty: 0, price: 0 };
         this.state.allocations[key] = { ...current, price: value };
     }
-    onCellClick(line, vendor) {
-        if (this.state.data?.approval_split_by_vendor) {
+    onCellClick(entry, col) {
+        if (this.state.header?.approval_split_by_vendor) {
             return;
         }
-        const full = Number(line.qty_request) || 0;
-        this.onChangeQty({ target: { value: full } }, line.product_id, vendor.id);
+        const full = Number(entry.page.lines.qty_request[entry.row]) || 0;
+        this.onChangeQty({ target: { value: full } }, entry, col);
     }
     async toggleSplit(ev) {
         const enabled = !!ev.target.checked;
         try {
             await this.orm.call("so.purchase.request", "write", [[this.requestId], { approval_split_by_vendor: enabled }]);
-            this.state.data.approval_split_by_vendor = enabled;
+            this.state.header.approval_split_by_vendor = enabled;
             this.notification.add(_t("Mode updated"), { type: "success" });
         } catch (e) {
             this.notification.add(e.message || _t("Failed to update mode"), { type: "danger" });
@@ -128,72 +366,87 @@ class PrqMatrix extends Component {
             throw e;
         }
     }
-    async save() {
+    /**
+     * Allocations of the fetched rows only; lines that were never scrolled into view
+     * keep their allocations on the server.
+     */
+    _buildAllocationPayload() {
         const payload = [];
-        const data = this.state.data;
-        for (const line of data.lines) {
-            const fullQty = Number(line.qty_request) || 0;
-            const quotes = line.quotes || {};
-            if (!data.approval_split_by_vendor) {
-                let selectedVendorId = null;
-                for (const v of data.vendors) {
-                    const key = this._getAllocKey(line.product_id, v.id);
-                    const a = this.state.allocations[key];
-                    if (a && Number(a.qty) > 0) {
-                        selectedVendorId = v.id;
-                        break;
-                    }
-                }
-                if (selectedVendorId === null) {
-                    selectedVendorId = this.state.bestByProduct?.[line.product_id] ?? (data.vendors[0] && data.vendors[0].id);
-                }
-                for (const v of data.vendors) {
-                    const key = this._getAllocKey(line.product_id, v.id);
-                    const a = this.state.allocations[key] || {};
-                    const cell = quotes[v.id] || quotes[String(v.id)] || {};
-                    const price = Number(a.price) || Number(cell.normalized_price_unit) || Number(cell.price_unit) || 0;
-                    payload.push({
-                        product_id: line.product_id,
-                        vendor_id: v.id,
-                        qty_alloc: v.id === selectedVendorId ? fullQty : 0,
-                        price_unit_alloc: v.id === selectedVendorId ? price : 0,
-                        taxes_id: [],
+        const productIds = [];
+        const header = this.state.header;
+        const vendorIds = header.vendors.ids;
+        for (const page of Object.values(this.state.pages)) {
+            page.lines.product_ids.forEach((productId, row) => {
+                productIds.push(productId);
+                const fullQty = Number(page.lines.qty_request[row]) || 0;
+                const fallback = this.state.bestByProduct[productId] ?? (vendorIds.length ? vendorIds[0] : null);
+                if (!header.approval_split_by_vendor) {
+                    let selectedCol = vendorIds.findIndex((vendorId) => {
+                        const a = this.state.allocations[this._getAllocKey(productId, vendorId)];
+                        return a && Number(a.qty) > 0;
                     });
+                    if (selectedCol < 0) {
+                        selectedCol = vendorIds.indexOf(fallback);
+                    }
+                    if (selectedCol >= 0 && fullQty > 0) {
+                        const a = this.state.allocations[this._getAllocKey(productId, vendorIds[selectedCol])] || {};
+                        const quote = this.getQuote(page, row, selectedCol) || {};
+                        const price = Number(a.price) || Number(quote.normalized_price_unit) || Number(quote.price_unit) || 0;
+                        payload.push({
+                            product_id: productId,
+                            vendor_id: vendorIds[selectedCol],
+                            qty_alloc: fullQty,
+                            price_unit_alloc: price,
+                            taxes_id: [],
+                        });
+                    }
+                    return;
                 }
-            } else {
                 let total = 0;
                 const perVendor = {};
-                for (const v of data.vendors) {
-                    const key = this._getAllocKey(line.product_id, v.id);
-                    const a = this.state.allocations[key] || {};
+                vendorIds.forEach((vendorId, col) => {
+                    const a = this.state.allocations[this._getAllocKey(productId, vendorId)] || {};
                     const qty = Number(a.qty) || 0;
-                    const cell = quotes[v.id] || quotes[String(v.id)] || {};
+                    const quote = this.getQuote(page, row, col) || {};
                     // Default unit price from RFQ first, then normalized as fallback
-                    const price = Number(a.price) || Number(cell.price_unit) || Number(cell.normalized_price_unit) || 0;
-                    perVendor[v.id] = { qty, price };
+                    const price = Number(a.price) || Number(quote.price_unit) || Number(quote.normalized_price_unit) || 0;
+                    perVendor[vendorId] = { qty, price };
                     total += qty;
+                });
+                if (total < fullQty && fallback) {
+                    perVendor[fallback].qty += fullQty - total;
                 }
-                if (total < fullQty) {
-                    const rest = fullQty - total;
-                    const fallback = this.state.bestByProduct?.[line.product_id] ?? (data.vendors[0] && data.vendors[0].id);
-                    if (fallback) {
-                        perVendor[fallback].qty += rest;
+                for (const vendorId of vendorIds) {
+                    const pv = perVendor[vendorId];
+                    if (!(pv.qty > 0)) {
+                        continue;
                     }
-                }
-                for (const v of data.vendors) {
-                    const pv = perVendor[v.id] || { qty: 0, price: 0 };
                     payload.push({
-                        product_id: line.product_id,
-                        vendor_id: v.id,
+                        product_id: productId,
+                        vendor_id: vendorId,
                         qty_alloc: pv.qty,
                         price_unit_alloc: pv.price,
                         taxes_id: [],
                     });
                 }
-            }
+            });
+        }
+        return { payload, productIds };
+    }
+    async autoAllocate() {
+        try {
+            await this.orm.call("so.purchase.request", "action_compute_optimal_allocation", [[this.requestId]]);
+            this.notification.add(_t("Optimal allocation computed"), { type: "success" });
+            await this.load();
+        } catch (e) {
+            this.notification.add(e.message || "Error", { type: "danger" });
+            throw e;
         }
+    }
+    async save() {
+        const { payload, productIds } = this._buildAllocationPayload();
         try {
-            await this.orm.call("so.purchase.request", "prq_save_allocations", [this.requestId, payload]);
+            await this.orm.call("so.purchase.request", "prq_save_allocations", [this.requestId, payload, productIds]);
             this.notification.add(_t("Allocations saved"), { type: "success" });
             await this.load();
         } catch (e) {
@@ -213,4 +466,3 @@ const PrqMatrixField = {
 };
 
 registry.category("fields").add("prq_matrix", PrqMatrixField);
-
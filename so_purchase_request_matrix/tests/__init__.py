@@ -0,0 +1,6 @@
+from . import test_allocation_solver
+from . import test_allocations
+from . import test_benchmark
+from . import test_consolidated
+from . import test_query_plans
+from . import test_quote_sync
@@ -0,0 +1,200 @@
+import json
+import logging
+import os
+import random
+import time
+from contextlib import contextmanager
+
+from odoo.tests.common import TransactionCase
+
+_logger = logging.getLogger(__name__)
+
+
+class PrqCommon(TransactionCase):
+    """A purchase request of three products with the RFQs of two vendors."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.env = cls.env(context=dict(cls.env.context, tracking_disable=True, mail_notrack=True))
+        cls.vendor_a, cls.vendor_b = cls.env["res.partner"].create([
+            {"name": "PRQ Vendor A", "supplier_rank": 1},
+            {"name": "PRQ Vendor B", "supplier_rank": 1},
+        ])
+        cls.products = cls.env["product.product"].create([
+            {"name": f"PRQ Product {index}", "type": "consu"} for index in range(1, 4)
+        ])
+        cls.product_1, cls.product_2, cls.product_3 = cls.products
+        customer = cls.env["res.partner"].create({"name": "PRQ Customer"})
+        cls.sale_order = cls.env["sale.order"].create({
+            "partner_id": customer.id,
+            "order_line": [(0, 0, {
+                "product_id": product.id,
+                "product_uom_qty": qty,
+            }) for product, qty in ((cls.product_1, 10), (cls.product_2, 5), (cls.product_3, 2))],
+        })
+        cls.request = cls.sale_order._create_purchase_requests()
+        cls.request.vendor_ids = cls.vendor_a | cls.vendor_b
+        cls.request.action_select_vendors()
+        cls.request.action_create_rfqs()
+
+    def _get_rfq_line(self, vendor, product):
+        return self.request.rfq_ids.filtered(lambda po: po.partner_id == vendor).order_line.filtered(
+            lambda line: line.product_id == product
+        )
+
+    def _get_quote(self, vendor, product):
+        return self.request.quote_line_ids.filtered(lambda quote: quote.vendor_id == vendor and quote.product_id == product)
+
+    def _set_prices(self, prices):
+        """Write the RFQ prices {(vendor, product): price} and sync the quotes."""
+        for (vendor, product), price in prices.items():
+            self._get_rfq_line(vendor, product).price_unit = price
+        self.request.action_sync_quotes()
+        self.env.flush_all()
+
+
+class PrqBenchmarkCommon(TransactionCase):
+    """Synthetic purchase request data and per-stage measurements.
+
+    The size of the generated data is read from the environment:
+
+    * ``PRQ_BENCH_LINES``: products per sales order, i.e. lines of the request (default 50)
+    * ``PRQ_BENCH_VENDORS``: vendors quoting every product (default 5)
+    * ``PRQ_BENCH_ORDERS``: sales orders consolidated into the request (default 5)
+    * ``PRQ_BENCH_OUTPUT``: path of the JSON file the measurements are written to
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.env = cls.env(context=dict(cls.env.context, tracking_disable=True, mail_notrack=True))
+        cls.bench_lines = int(os.environ.get("PRQ_BENCH_LINES", 50))
+        cls.bench_vendors = int(os.environ.get("PRQ_BENCH_VENDORS", 5))
+        cls.bench_orders = int(os.environ.get("PRQ_BENCH_ORDERS", 5))
+        cls.rng = random.Random(42)
+        cls.products = cls._generate_products(cls.bench_lines)
+        cls.vendors = cls._generate_vendors(cls.bench_vendors)
+        cls.sale_orders = cls._generate_sale_orders(cls.bench_orders, cls.products)
+
+    def setUp(self):
+        super().setUp()
+        self.measurements = {}
+
+    # ---------- Synthetic data ----------
+    @classmethod
+    def _generate_products(cls, count):
+        return cls.env["product.product"].create([{
+            "name": f"PRQ Benchmark Product {index}",
+            "default_code": f"PRQ-BENCH-{index:06d}",
+            "type": "consu",
+            "standard_price": cls.rng.uniform(1.0, 100.0),
+        } for index in range(count)])
+
+    @classmethod
+    def _generate_vendors(cls, count):
+        return cls.env["res.partner"].create([{
+            "name": f"PRQ Benchmark Vendor {index}",
+            "supplier_rank": 1,
+        } for index in range(count)])
+
+    @classmethod
+    def _generate_sale_orders(cls, count, products):
+        customer = cls.env["res.partner"].create({"name": "PRQ Benchmark Customer"})
+        return cls.env["sale.order"].create([{
+            "partner_id": customer.id,
+            "order_line": [(0, 0, {
+                "product_id": product.id,
+                "product_uom_qty": cls.rng.randint(1, 100),
+            }) for product in products],
+        } for _index in range(count)])
+
+    def _generate_quotes(self, request):
+        """Give a random price to every RFQ line of ``request``, as returned by the vendors.
+
+        The incremental quote sync is skipped, so that the quote lines are only created
+        by the measured ``action_sync_quotes`` stage.
+        """
+        lines = request.rfq_ids.order_line.with_context(prq_skip_quote_sync=True)
+        prices = {}
+        for line in lines:
+            price = round(self.rng.uniform(1.0, 100.0), 2)
+            prices.setdefault(price, []).append(line.id)
+        for price, line_ids in prices.items():
+            lines.browse(line_ids).write({"price_unit": price})
+        self.env.flush_all()
+        self.env.cr.flush()
+
+    def _create_quoted_request(self):
+        """Consolidate the sales orders into a request with quoted RFQs and allocations."""
+        wizard = self.env["so.create.purchase.request.wizard"].create({
+            "sale_order_ids": [(6, 0, self.sale_orders.ids)],
+            "request_mode": "consolidated",
+        })
+        request = self.env["so.purchase.request"].search(wizard.action_confirm()["domain"])
+        request.vendor_ids = self.vendors
+        request.action_select_vendors()
+        request.action_create_rfqs()
+        self._generate_quotes(request)
+        request.action_sync_quotes()
+        self.env["so.purchase.request"].prq_save_allocations(request.id, [{
+            "product_id": line.product_id.id,
+            "vendor_id": self.vendors[line.id % len(self.vendors)].id,
+            "qty_alloc": line.qty_request,
+        } for line in request.line_ids])
+        self.env.flush_all()
+        return request
+
+    # ---------- Measurements ----------
+    @contextmanager
+    def measure(self, stage):
+        """Record the wall time and the SQL queries of the enclosed block under ``stage``.
+
+        The ORM cache is emptied beforehand, and pending writes as well as pre-commit
+        hooks (quote sync, matrix notifications) are included in the measurement.
+        """
+        self.env.flush_all()
+        self.env.cr.flush()
+        self.env.invalidate_all()
+        queries = self.env.cr.sql_log_count
+        start = time.perf_counter()
+        yield
+        self.env.flush_all()
+        self.env.cr.flush()
+        self.measurements[stage] = {
+            "duration": round(time.perf_counter() - start, 6),
+            "queries": self.env.cr.sql_log_count - queries,
+        }
+
+    def write_measurements(self):
+        result = {
+            "size": {
+                "lines": self.bench_lines,
+                "vendors": self.bench_vendors,
+                "orders": self.bench_orders,
+            },
+            "stages": self.measurements,
+        }
+        output = os.environ.get("PRQ_BENCH_OUTPUT")
+        if output:
+            with open(output, "w") as file:
+                json.dump(result, file, indent=2)
+        _logger.info("Purchase request benchmark: %s", json.dumps(result))
+        return result
+
+    def assertQueryBudgets(self, budgets):
+        """Fail for every stage whose query count exceeds its budget.
+
+        :param budgets: dict {stage: (fixed, per_vendor)}; budgets deliberately do not
+                        depend on the number of lines, which must not add queries
+        """
+        exceeded = []
+        for stage, (fixed, per_vendor) in budgets.items():
+            if stage not in self.measurements:
+                continue
+            budget = fixed + per_vendor * self.bench_vendors
+            queries = self.measurements[stage]["queries"]
+            if queries > budget:
+                exceeded.append(f"{stage}: {queries} queries, budget {budget}")
+        if exceeded:
+            self.fail("Query budgets exceeded:\n" + "\n".join(exceeded))
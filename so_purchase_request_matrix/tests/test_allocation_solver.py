@@ -0,0 +1,116 @@
+import numpy as np
+
+from odoo import fields
+from odoo.tests.common import BaseCase
+
+from ..models.allocation_solver import solve_allocation
+from .common import PrqCommon
+
+INF = np.inf
+
+
+class TestAllocationSolver(BaseCase):
+
+    def assertAllocation(self, result, expected_alloc, expected_unmet):
+        alloc, unmet = result
+        np.testing.assert_allclose(alloc, expected_alloc)
+        np.testing.assert_allclose(unmet, expected_unmet)
+
+    def test_cheapest_vendor(self):
+        result = solve_allocation([[1.0, 2.0], [3.0, 1.0]], [[INF, INF], [INF, INF]], [5.0, 4.0])
+        self.assertAllocation(result, [[5.0, 0.0], [0.0, 4.0]], [0.0, 0.0])
+
+    def test_capacity_spills_over_to_next_vendor(self):
+        result = solve_allocation([[1.0, 2.0]], [[3.0, INF]], [5.0])
+        self.assertAllocation(result, [[3.0, 2.0]], [0.0])
+
+    def test_unmet_demand(self):
+        result = solve_allocation([[1.0, INF]], [[3.0, INF]], [5.0])
+        self.assertAllocation(result, [[3.0, 0.0]], [2.0])
+
+    def test_single_vendor(self):
+        # the cheapest vendor cannot cover the whole demand on its own
+        result = solve_allocation([[1.0, 2.0]], [[3.0, 10.0]], [5.0], single_vendor=True)
+        self.assertAllocation(result, [[0.0, 5.0]], [0.0])
+
+    def test_single_vendor_without_capacity(self):
+        result = solve_allocation([[1.0, 2.0]], [[3.0, 4.0]], [5.0], single_vendor=True)
+        self.assertAllocation(result, [[0.0, 0.0]], [5.0])
+
+    def test_max_vendors(self):
+        prices = [[1.0, 2.0, 3.0], [3.0, 1.0, 2.0]]
+        capacities = np.full((2, 3), INF)
+        result = solve_allocation(prices, capacities, [1.0, 1.0], max_vendors=1)
+        self.assertAllocation(result, [[0.0, 1.0, 0.0], [0.0, 1.0, 0.0]], [0.0, 0.0])
+
+    def test_min_order_value(self):
+        # vendor 1 would only get an order of 4, below the minimum of 5
+        prices = [[1.0, 2.0], [5.0, 4.0]]
+        capacities = np.full((2, 2), INF)
+        result = solve_allocation(prices, capacities, [10.0, 1.0], min_order_value=5.0)
+        self.assertAllocation(result, [[10.0, 0.0], [1.0, 0.0]], [0.0, 0.0])
+
+    def test_min_order_value_keeps_needed_vendor(self):
+        prices = [[1.0, INF], [INF, 4.0]]
+        capacities = np.full((2, 2), INF)
+        result = solve_allocation(prices, capacities, [10.0, 1.0], min_order_value=5.0)
+        self.assertAllocation(result, [[10.0, 0.0], [0.0, 1.0]], [0.0, 0.0])
+
+
+class TestAllocationProblem(PrqCommon):
+
+    def _get_allocations(self, product):
+        return self.request.allocation_ids.filtered(lambda alloc: alloc.product_id == product)
+
+    def test_allocation_problem(self):
+        self._set_prices({
+            (self.vendor_a, self.product_1): 10.0,
+            (self.vendor_b, self.product_1): 12.0,
+            (self.vendor_b, self.product_2): 3.0,
+        })
+        product_ids, vendor_ids, prices, capacities, demand = self.request._get_allocation_problem()
+        row = product_ids.index(self.product_1.id)
+        col_a, col_b = vendor_ids.index(self.vendor_a.id), vendor_ids.index(self.vendor_b.id)
+        self.assertEqual(prices[row, col_a], 10.0)
+        self.assertEqual(prices[row, col_b], 12.0)
+        self.assertEqual(capacities[row, col_a], 10.0)
+        # vendors without a price are left out
+        self.assertTrue(np.isinf(prices[product_ids.index(self.product_2.id), col_a]))
+        self.assertTrue(np.isinf(prices[product_ids.index(self.product_3.id)]).all())
+        self.assertEqual(demand.tolist(), [10.0, 5.0, 2.0])
+
+    def test_compute_optimal_allocation(self):
+        self._set_prices({
+            (self.vendor_a, self.product_1): 10.0,
+            (self.vendor_b, self.product_1): 12.0,
+            (self.vendor_a, self.product_2): 4.0,
+            (self.vendor_b, self.product_2): 3.0,
+            (self.vendor_a, self.product_3): 1.0,
+        })
+        self.request.action_compute_optimal_allocation()
+        self.assertEqual(self._get_allocations(self.product_1).vendor_id, self.vendor_a)
+        self.assertEqual(self._get_allocations(self.product_2).vendor_id, self.vendor_b)
+        self.assertEqual(self._get_allocations(self.product_3).vendor_id, self.vendor_a)
+        self.assertEqual(self._get_allocations(self.product_2).qty_alloc, 5.0)
+        self.request.action_approve()
+        self.assertEqual(self.request.state, "approved")
+
+    def test_quote_validity_and_lead_time(self):
+        prices = {(vendor, product): price for vendor, price in ((self.vendor_a, 1.0), (self.vendor_b, 2.0)) for product in self.products}
+        # RFQs sent a while ago are not expired
+        self.request.rfq_ids.date_order = fields.Datetime.subtract(fields.Datetime.now(), days=10)
+        self._set_prices(prices)
+        self.request.action_compute_optimal_allocation()
+        self.assertEqual(self.request.allocation_ids.vendor_id, self.vendor_a)
+        # an expired validity or a too long lead time excludes the cheapest vendor
+        rfq_a = self.request.rfq_ids.filtered(lambda po: po.partner_id == self.vendor_a)
+        rfq_a.so_quote_validity_date = fields.Date.subtract(fields.Date.today(), days=1)
+        self.request.action_sync_quotes()
+        self.request.action_compute_optimal_allocation()
+        self.assertEqual(self.request.allocation_ids.vendor_id, self.vendor_b)
+        rfq_a.so_quote_validity_date = False
+        rfq_a.order_line.date_planned = fields.Datetime.add(fields.Datetime.now(), days=30)
+        self.request.solver_max_lead_time = 20
+        self.request.action_sync_quotes()
+        self.request.action_compute_optimal_allocation()
+        self.assertEqual(self.request.allocation_ids.vendor_id, self.vendor_b)
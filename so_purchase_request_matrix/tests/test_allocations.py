@@ -0,0 +1,49 @@
+from odoo.exceptions import ValidationError
+
+from .common import PrqCommon
+
+
+class TestAllocations(PrqCommon):
+
+    def _save(self, allocations, product_ids=None):
+        self.env["so.purchase.request"].prq_save_allocations(self.request.id, [{
+            "product_id": product.id,
+            "vendor_id": vendor.id,
+            "qty_alloc": qty,
+            "price_unit_alloc": price,
+        } for product, vendor, qty, price in allocations], product_ids=product_ids)
+
+    def _get_allocations(self, product):
+        return self.request.allocation_ids.filtered(lambda alloc: alloc.product_id == product)
+
+    def test_save_allocations_wrong_total(self):
+        with self.assertRaises(ValidationError):
+            self._save([(self.product_1, self.vendor_a, 4.0, 1.0)])
+        with self.assertRaises(ValidationError):
+            self._save([], product_ids=[self.product_1.id])
+
+    def test_save_allocations_diff(self):
+        self._save([(self.product_1, self.vendor_a, 10.0, 1.0), (self.product_2, self.vendor_a, 5.0, 2.0)])
+        alloc_1 = self._get_allocations(self.product_1)
+        alloc_2 = self._get_allocations(self.product_2)
+        # same cell: written in place
+        self._save([(self.product_1, self.vendor_a, 10.0, 1.5)])
+        self.assertEqual(self._get_allocations(self.product_1), alloc_1)
+        self.assertEqual(alloc_1.price_unit_alloc, 1.5)
+        # split over both vendors: a new row is added, other products are kept
+        self._save([(self.product_1, self.vendor_a, 6.0, 1.5), (self.product_1, self.vendor_b, 4.0, 1.2)])
+        self.assertEqual(len(self._get_allocations(self.product_1)), 2)
+        self.assertIn(alloc_1, self._get_allocations(self.product_1))
+        self.assertEqual(self._get_allocations(self.product_2), alloc_2)
+        # moved to another vendor: the previous row is dropped
+        self._save([(self.product_1, self.vendor_b, 10.0, 1.2)])
+        self.assertFalse(alloc_1.exists())
+        self.assertEqual(self._get_allocations(self.product_1).vendor_id, self.vendor_b)
+
+    def test_save_allocations_partial(self):
+        # the products not sent are only checked on approval
+        self._save([(self.product_1, self.vendor_a, 10.0, 1.0)])
+        self.assertEqual(self._get_allocations(self.product_1).vendor_id, self.vendor_a)
+        self.assertFalse(self._get_allocations(self.product_2))
+        with self.assertRaises(ValidationError):
+            self.request.action_approve()
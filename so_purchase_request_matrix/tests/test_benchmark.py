@@ -0,0 +1,73 @@
+from odoo.tests import tagged
+
+from .common import PrqBenchmarkCommon
+
+# Queries allowed per stage as (fixed, per vendor); the number of lines must not add any
+QUERY_BUDGETS = {
+    "wizard_action_confirm": (60, 0),
+    "action_create_rfqs": (80, 4),
+    "action_sync_quotes": (60, 0),
+    "_compute_normalized": (30, 0),
+    "prq_get_matrix_data": (30, 0),
+    "prq_save_allocations": (40, 0),
+    "action_create_pos": (100, 10),
+}
+
+
+@tagged("-standard", "-at_install", "post_install", "prq_benchmark")
+class TestPrqBenchmark(PrqBenchmarkCommon):
+    """Request lifecycle benchmark, run with ``--test-tags prq_benchmark``."""
+
+    def test_request_lifecycle(self):
+        Request = self.env["so.purchase.request"]
+        wizard = self.env["so.create.purchase.request.wizard"].create({
+            "sale_order_ids": [(6, 0, self.sale_orders.ids)],
+            "request_mode": "consolidated",
+        })
+        with self.measure("wizard_action_confirm"):
+            action = wizard.action_confirm()
+        request = Request.search(action["domain"])
+        self.assertEqual(len(request.line_ids), self.bench_lines)
+
+        request.vendor_ids = self.vendors
+        request.action_select_vendors()
+        with self.measure("action_create_rfqs"):
+            request.action_create_rfqs()
+        self.assertEqual(len(request.rfq_ids), self.bench_vendors)
+
+        self._generate_quotes(request)
+        with self.measure("action_sync_quotes"):
+            request.action_sync_quotes()
+        quote_lines = request.quote_line_ids
+        self.assertEqual(len(quote_lines), self.bench_lines * self.bench_vendors)
+
+        with self.measure("_compute_normalized"):
+            for fname in ("normalized_price_unit", "normalized_qty"):
+                self.env.add_to_compute(quote_lines._fields[fname], quote_lines)
+            quote_lines.flush_recordset(["normalized_price_unit", "normalized_qty"])
+
+        with self.measure("prq_get_matrix_data"):
+            Request.prq_get_matrix_data(request.id)
+
+        cheapest = {}
+        for quote in quote_lines:
+            best = cheapest.get(quote.product_id.id)
+            if best is None or quote.normalized_price_unit < best.normalized_price_unit:
+                cheapest[quote.product_id.id] = quote
+        allocations = [{
+            "product_id": line.product_id.id,
+            "vendor_id": cheapest[line.product_id.id].vendor_id.id,
+            "qty_alloc": line.qty_request,
+            "price_unit_alloc": cheapest[line.product_id.id].normalized_price_unit,
+        } for line in request.line_ids]
+        with self.measure("prq_save_allocations"):
+            Request.prq_save_allocations(request.id, allocations)
+
+        request.action_submit_for_approval()
+        request.action_approve()
+        with self.measure("action_create_pos"):
+            request.action_create_pos()
+        self.assertEqual(request.state, "po_created")
+
+        self.write_measurements()
+        self.assertQueryBudgets(QUERY_BUDGETS)
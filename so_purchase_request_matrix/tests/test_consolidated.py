@@ -0,0 +1,82 @@
+from .common import PrqCommon
+
+
+class TestConsolidatedRequest(PrqCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.uom_unit = cls.env.ref("uom.product_uom_unit")
+        cls.uom_dozen = cls.env.ref("uom.product_uom_dozen")
+        customer = cls.env["res.partner"].create({"name": "PRQ Consolidated Customer"})
+        cls.sale_order_1, cls.sale_order_2 = cls.env["sale.order"].create([{
+            "partner_id": customer.id,
+            "order_line": [(0, 0, {
+                "product_id": product.id,
+                "product_uom": uom.id,
+                "product_uom_qty": qty,
+            }) for product, uom, qty in lines],
+        } for lines in (
+            ((cls.product_1, cls.uom_dozen, 2), (cls.product_2, cls.uom_unit, 3)),
+            ((cls.product_1, cls.uom_unit, 6), (cls.product_2, cls.uom_unit, 4)),
+        )])
+        cls.consolidated = (cls.sale_order_1 | cls.sale_order_2)._create_consolidated_purchase_request()
+
+    def _get_sale_line(self, sale_order, product):
+        return sale_order.order_line.filtered(lambda line: line.product_id == product)
+
+    def _get_request_line(self, product):
+        return self.consolidated.line_ids.filtered(lambda line: line.product_id == product)
+
+    def test_demand_aggregation(self):
+        self.assertTrue(self.consolidated.is_consolidated)
+        self.assertEqual(self.consolidated.sale_order_ids, self.sale_order_1 | self.sale_order_2)
+        self.assertEqual(self.sale_order_1.so_purchase_request_id, self.consolidated)
+        self.assertEqual(len(self.consolidated.line_ids), 2)
+        # expressed in the UoM of the first sale line: 2 dozens + 6 units
+        line_1 = self._get_request_line(self.product_1)
+        self.assertEqual(line_1.product_uom_id, self.uom_dozen)
+        self.assertAlmostEqual(line_1.qty_request, 2.5)
+        self.assertEqual(
+            line_1.sale_line_ids,
+            self._get_sale_line(self.sale_order_1, self.product_1) | self._get_sale_line(self.sale_order_2, self.product_1),
+        )
+        line_2 = self._get_request_line(self.product_2)
+        self.assertEqual(line_2.product_uom_id, self.uom_unit)
+        self.assertAlmostEqual(line_2.qty_request, 7.0)
+
+    def test_final_pos_split_per_sale_line(self):
+        request = self.consolidated
+        request.vendor_ids = self.vendor_a | self.vendor_b
+        self.env["so.purchase.request"].prq_save_allocations(request.id, [
+            {"product_id": self.product_1.id, "vendor_id": self.vendor_a.id, "qty_alloc": 1.5, "price_unit_alloc": 100.0},
+            {"product_id": self.product_1.id, "vendor_id": self.vendor_b.id, "qty_alloc": 1.0, "price_unit_alloc": 110.0},
+            {"product_id": self.product_2.id, "vendor_id": self.vendor_a.id, "qty_alloc": 7.0, "price_unit_alloc": 5.0},
+        ])
+        request.action_approve()
+        request.action_create_pos()
+        self.assertEqual(request.state, "po_created")
+
+        def served(vendor, product):
+            """{sale line: quantity in request line UoM} of the vendor's final PO lines."""
+            request_uom = self._get_request_line(product).product_uom_id
+            lines = request.final_po_ids.filtered(lambda po: po.partner_id == vendor).order_line.filtered(
+                lambda line: line.product_id == product
+            )
+            result = {}
+            for line in lines:
+                result[line.so_sale_line_id] = result.get(line.so_sale_line_id, 0.0) + line.product_uom._compute_quantity(
+                    line.product_qty, request_uom
+                )
+            return result
+
+        sale_line_1_1 = self._get_sale_line(self.sale_order_1, self.product_1)
+        sale_line_2_1 = self._get_sale_line(self.sale_order_2, self.product_1)
+        # the first vendor serves the first sales order, the second one the rest of the demand
+        self.assertEqual(served(self.vendor_a, self.product_1), {sale_line_1_1: 1.5})
+        self.assertEqual(served(self.vendor_b, self.product_1), {sale_line_1_1: 0.5, sale_line_2_1: 0.5})
+        self.assertEqual(served(self.vendor_a, self.product_2), {
+            self._get_sale_line(self.sale_order_1, self.product_2): 3.0,
+            self._get_sale_line(self.sale_order_2, self.product_2): 4.0,
+        })
+        self.assertFalse(served(self.vendor_b, self.product_2))
@@ -0,0 +1,23 @@
+import logging
+
+from odoo.tests import tagged
+
+from .common import PrqBenchmarkCommon
+
+_logger = logging.getLogger(__name__)
+
+
+@tagged("-standard", "-at_install", "post_install", "prq_query_plans")
+class TestPrqQueryPlans(PrqBenchmarkCommon):
+    """Index coverage of the hot lookups, run with ``--test-tags prq_query_plans``.
+
+    The timings are only meaningful on a large dataset, see ``PRQ_BENCH_LINES`` and co.
+    """
+
+    def test_hot_queries_use_indexes(self):
+        request = self._create_quoted_request()
+        report = self.env["so.purchase.request.perf.log"]._explain_hot_queries(request)
+        for entry in report:
+            _logger.info("Purchase request lookup %s: %.3f ms", entry["name"], entry["duration"])
+        seq_scans = {entry["name"]: entry["seq_scans"] for entry in report if entry["seq_scans"]}
+        self.assertFalse(seq_scans, "Lookups without a usable index: %s" % seq_scans)
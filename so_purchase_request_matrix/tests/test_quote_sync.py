@@ -0,0 +1,62 @@
+from odoo.tests.common import new_test_user
+
+from .common import PrqCommon
+
+
+class TestQuoteSync(PrqCommon):
+
+    def test_sync_quotes(self):
+        self._set_prices({(self.vendor_a, self.product_1): 10.0, (self.vendor_b, self.product_1): 12.0})
+        self.assertEqual(len(self.request.quote_line_ids), 6)
+        self.assertEqual(self._get_quote(self.vendor_a, self.product_1).price_unit_quote, 10.0)
+        self.assertEqual(self._get_quote(self.vendor_b, self.product_1).price_unit_quote, 12.0)
+        self.assertEqual(self._get_quote(self.vendor_a, self.product_2).price_unit_quote, 0.0)
+
+    def test_sync_quotes_updates_in_place(self):
+        self._set_prices({(self.vendor_a, self.product_1): 10.0})
+        quotes = self.request.quote_line_ids
+        self._set_prices({(self.vendor_a, self.product_1): 9.0})
+        self.assertEqual(self.request.quote_line_ids, quotes)
+        self.assertEqual(self._get_quote(self.vendor_a, self.product_1).price_unit_quote, 9.0)
+
+    def test_incremental_sync_on_rfq_edit(self):
+        self._set_prices({(self.vendor_a, self.product_1): 10.0})
+        self._get_rfq_line(self.vendor_a, self.product_1).price_unit = 8.0
+        self.env.flush_all()
+        self.env.cr.precommit.run()
+        self.assertEqual(self._get_quote(self.vendor_a, self.product_1).price_unit_quote, 8.0)
+        self.assertEqual(self._get_quote(self.vendor_b, self.product_1).price_unit_quote, 0.0)
+
+    def test_rfq_edit_by_purchase_user(self):
+        # purchase users without the purchase request groups still edit the RFQs
+        user = new_test_user(self.env, login="prq_purchase_user", groups="purchase.group_purchase_user")
+        self._set_prices({(self.vendor_a, self.product_1): 10.0})
+        self._get_rfq_line(self.vendor_a, self.product_1).with_user(user).price_unit = 8.0
+        self.request.rfq_ids.with_user(user).write({"notes": "Updated"})
+        self.env.flush_all()
+        self.env.cr.precommit.run()
+        self.assertEqual(self._get_quote(self.vendor_a, self.product_1).price_unit_quote, 8.0)
+
+    def test_unlinked_rfq_line_removes_quote(self):
+        self._set_prices({(self.vendor_a, self.product_3): 4.0})
+        self._get_rfq_line(self.vendor_a, self.product_3).unlink()
+        self.env.flush_all()
+        self.env.cr.precommit.run()
+        self.assertFalse(self._get_quote(self.vendor_a, self.product_3))
+        self.assertTrue(self._get_quote(self.vendor_b, self.product_3))
+        # the full sync drops them as well
+        self._get_rfq_line(self.vendor_b, self.product_3).with_context(prq_skip_quote_sync=True).unlink()
+        self.request.action_sync_quotes()
+        self.assertFalse(self._get_quote(self.vendor_b, self.product_3))
+        self.assertEqual(len(self.request.quote_line_ids), 4)
+
+    def test_imported_prices_survive_sync(self):
+        self.request.action_sync_quotes()
+        header = next(self.request._get_matrix_export_rows())
+        vendor_col = header.index(f"{self.vendor_a.display_name} [{self.vendor_a.id}]")
+        row = [self.product_2.id, self.product_2.display_name, 5.0, ""] + [""] * (len(header) - 4)
+        row[vendor_col] = 7.5
+        self.assertEqual(self.request._import_quote_rows([header, row]), 1)
+        self.assertEqual(self._get_rfq_line(self.vendor_a, self.product_2).price_unit, 7.5)
+        self.request.action_sync_quotes()
+        self.assertEqual(self._get_quote(self.vendor_a, self.product_2).price_unit_quote, 7.5)
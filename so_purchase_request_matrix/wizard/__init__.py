@@ -1,2 +1,3 @@
 from . import so_create_request_wizard
 
+from . import prq_quote_import_wizard
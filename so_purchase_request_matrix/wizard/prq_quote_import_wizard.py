@@ -0,0 +1,48 @@
+import base64
+import csv
+import io
+
+from odoo import fields, models, _
+from odoo.exceptions import UserError
+
+try:
+    from openpyxl import load_workbook
+except ImportError:
+    load_workbook = None
+
+
+class PurchaseRequestQuoteImportWizard(models.TransientModel):
+    _name = "so.purchase.request.quote.import.wizard"
+    _description = "Import Vendor Quotes into a Purchase Request"
+
+    request_id = fields.Many2one("so.purchase.request", string="Purchase Request", required=True, ondelete="cascade")
+    file = fields.Binary(string="File", required=True, attachment=False,
+                         help="CSV or XLSX file returned from the matrix export, with the vendor prices filled in.")
+    filename = fields.Char(string="File Name")
+
+    def _iter_rows(self):
+        """Rows of the uploaded file, read lazily."""
+        data = base64.b64decode(self.file)
+        if (self.filename or "").lower().endswith(".xlsx"):
+            if load_workbook is None:
+                raise UserError(_("The openpyxl library is required to import XLSX files."))
+            workbook = load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+            try:
+                yield from workbook.active.iter_rows(values_only=True)
+            finally:
+                workbook.close()
+        else:
+            yield from csv.reader(io.TextIOWrapper(io.BytesIO(data), encoding="utf-8-sig", newline=""))
+
+    def action_import(self):
+        self.ensure_one()
+        count = self.request_id._import_quote_rows(self._iter_rows())
+        return {
+            "type": "ir.actions.client",
+            "tag": "display_notification",
+            "params": {
+                "type": "success",
+                "message": _("%s vendor prices imported.", count),
+                "next": {"type": "ir.actions.act_window_close"},
+            },
+        }
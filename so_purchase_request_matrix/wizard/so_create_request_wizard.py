@@ -6,30 +6,53 @@ class SoCreatePurchaseRequestWizard(models.TransientModel):
     _name = "so.create.purchase.request.wizard"
     _description = "Create Purchase Request from Sales Order"
 
-    sale_order_id = fields.Many2one("sale.order", string="Sales Order", required=True)
+    sale_order_id = fields.Many2one("sale.order", string="Sales Order")
+    sale_order_ids = fields.Many2many("sale.order", string="Sales Orders")
+    request_mode = fields.Selection([
+        ("per_order", "One Request per Sales Order"),
+        ("consolidated", "One Consolidated Request"),
+    ], string="Mode", default="per_order", required=True)
     note = fields.Text(string="Note")
+    run_in_background = fields.Boolean(string="Run in Background",
+                                       help="Create the requests by chunks from a scheduled action instead of right away.")
+
+    @api.model
+    def default_get(self, fields_list):
+        res = super().default_get(fields_list)
+        context = self.env.context
+        if "sale_order_ids" in fields_list and not res.get("sale_order_ids") and not res.get("sale_order_id") \
+                and context.get("active_model") == "sale.order" and context.get("active_ids"):
+            res["sale_order_ids"] = [(6, 0, context["active_ids"])]
+        return res
 
     def action_confirm(self):
         self.ensure_one()
+        if not self.sale_order_ids:
+            return self._confirm_single()
+        orders = self.sale_order_ids
+        if self.request_mode == "consolidated":
+            requests = orders._create_consolidated_purchase_request(note=self.note)
+        elif self.run_in_background:
+            orders._enqueue_purchase_requests()
+            return True
+        else:
+            requests = orders._create_purchase_requests(note=self.note)
+        if not requests:
+            raise UserError(_("All selected Sales Orders already have a Purchase Request or have no product lines."))
+        return {
+            "type": "ir.actions.act_window",
+            "name": _("Purchase Requests"),
+            "res_model": "so.purchase.request",
+            "view_mode": "list,form",
+            "domain": [("id", "in", requests.ids)],
+        }
+
+    def _confirm_single(self):
         sale = self.sale_order_id
+        if not sale:
+            raise UserError(_("Please select a Sales Order."))
         if sale.so_purchase_request_id:
             raise UserError(_("A Purchase Request already exists for this Sales Order."))
-        if not sale.order_line:
+        if not sale._get_purchase_request_lines():
             raise UserError(_("No lines in Sales Order to create request from."))
-        request = self.env["so.purchase.request"].create({
-            "sale_order_id": sale.id,
-            "note": self.note or False,
-        })
-        lines_vals = []
-        for so_line in sale.order_line.filtered(lambda l: not l.display_type and l.product_id):
-            uom = so_line.product_uom or so_line.product_id.uom_po_id
-            lines_vals.append({
-                "request_id": request.id,
-                "product_id": so_line.product_id.id,
-                "product_uom_id": uom.id,
-                "qty_request": so_line.product_uom_qty,
-                "description": so_line.name,
-            })
-        if lines_vals:
-            self.env["so.purchase.request.line"].create(lines_vals)
-        sale.so_purchase_request_id = request.id
+        sale._create_purchase_requests(note=self.note)